@@ -10,6 +10,7 @@ from src.core.config import setting
 from src.models import user
 from src.models import book
 from src.models import library
+from src.models import revoked_token
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
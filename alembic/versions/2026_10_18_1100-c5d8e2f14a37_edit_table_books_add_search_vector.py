@@ -0,0 +1,52 @@
+"""edit table Books add search_vector
+
+Revision ID: c5d8e2f14a37
+Revises: a41d7e0c9b15
+Create Date: 2026-10-18 11:00:12.530184
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d8e2f14a37"
+down_revision: Union[str, None] = "a41d7e0c9b15"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "books",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_books_search_vector",
+        "books",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_books_search_vector", table_name="books", postgresql_using="gin")
+    op.drop_column("books", "search_vector")
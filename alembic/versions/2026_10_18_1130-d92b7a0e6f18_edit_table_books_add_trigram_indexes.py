@@ -0,0 +1,54 @@
+"""edit table Books add trigram indexes
+
+Revision ID: d92b7a0e6f18
+Revises: c5d8e2f14a37
+Create Date: 2026-10-18 11:30:27.114903
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d92b7a0e6f18"
+down_revision: Union[str, None] = "c5d8e2f14a37"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY: таблица books не блокируется на запись на время построения
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_books_title_trgm",
+            "books",
+            ["title"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_books_author_trgm",
+            "books",
+            ["author"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"author": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_books_author_trgm", table_name="books", postgresql_concurrently=True
+        )
+        op.drop_index(
+            "ix_books_title_trgm", table_name="books", postgresql_concurrently=True
+        )
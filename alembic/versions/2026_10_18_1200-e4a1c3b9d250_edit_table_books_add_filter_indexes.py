@@ -0,0 +1,58 @@
+"""edit table Books add filter indexes
+
+Revision ID: e4a1c3b9d250
+Revises: d92b7a0e6f18
+Create Date: 2026-10-18 12:00:48.306127
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4a1c3b9d250"
+down_revision: Union[str, None] = "d92b7a0e6f18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES: list[tuple[str, list[str], dict]] = [
+    ("ix_books_author_release_date", ["author", "release_date", "id"], {}),
+    ("ix_books_author_id", ["author", "id"], {}),
+    ("ix_books_title_id", ["title", "id"], {}),
+    ("ix_books_release_date_id", ["release_date", "id"], {}),
+    (
+        "ix_books_release_date_desc_id",
+        [sa.text("release_date DESC NULLS LAST"), sa.text("id DESC")],
+        {},
+    ),
+    (
+        "ix_books_title_pattern",
+        ["title"],
+        {"postgresql_ops": {"title": "varchar_pattern_ops"}},
+    ),
+    ("ix_books_available_id", ["id"], {"postgresql_where": sa.text("count > 0")}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, columns, options in INDEXES:
+            op.create_index(
+                name,
+                "books",
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                **options,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name="books", postgresql_concurrently=True)
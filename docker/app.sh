@@ -1,4 +1,4 @@
 #!/bin/bash
 
-gunicorn src.main:app --workers 2 --worker-class uvicorn.workers.UvicornWorker --bind=0.0.0.0:8000
+gunicorn src.main:app --workers 2 --worker-class uvicorn.workers.UvicornWorker --bind=0.0.0.0:8000 --forwarded-allow-ips="${FORWARDED_ALLOW_IPS:-127.0.0.1}"
 
@@ -1,26 +1,69 @@
 import logging
-from typing import Optional, Union
+from typing import Any, Literal, Optional, Union
 
-from sqlalchemy import select
-from sqlalchemy.engine import Result
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    bindparam,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.engine import Result, Row
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.book import Book
+from src.models.book import SEARCH_CONFIG, Book
 from src.api_v1.books.schemas import (
+    BookFilterSchemas,
     BookUpdateSchemas,
     BookUpdatePartialSchemas,
     BookCreateSchemas,
 )
 from src.core.exceptions import ErrorInData, ExceptDB
-from src.core.config import configure_logging
+from src.core.pagination import keyset_condition, keyset_order
+from src.core.statements import statements
 
-configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
+stmt_books = statements.add("books", select(Book).order_by(Book.id))
+
+BOOK_COLUMNS = (
+    Book.title,
+    Book.author,
+    Book.release_date,
+    Book.isbn,
+    Book.count,
+    Book.id,
+)
+stmt_book_rows = statements.add(
+    "book_rows", select(*BOOK_COLUMNS).order_by(Book.id)
+)
+BookSort = Literal[
+    "id", "-id", "title", "-title", "author", "-author", "release_date", "-release_date"
+]
+SORT_COLUMNS = {
+    "id": Book.id,
+    "title": Book.title,
+    "author": Book.author,
+    "release_date": Book.release_date,
+}
+SEARCH_COLUMNS = (*BOOK_COLUMNS, Book.description)
+# литерал, а не параметр: иначе обобщенный план не сможет использовать
+# частичный индекс ix_books_available_id
+BOOK_AVAILABLE = Book.count > literal_column("0")
+# available=false индексом не обеспечен (см. ix_books_available_id)
+BOOK_UNAVAILABLE = Book.count == literal_column("0")
+stmt_book_row = statements.add(
+    "book_row", select(*BOOK_COLUMNS).where(Book.id == bindparam("book_id"))
+)
+
 
 async def get_book(session: AsyncSession, book_id: int) -> Optional[Book]:
-    logger.info("Getting genre by id %d" % book_id)
+    logger.info("Getting genre by id %d", book_id)
     return await session.get(Book, book_id)
 
 
@@ -43,26 +86,40 @@ async def create_book(session: AsyncSession, book_in: BookCreateSchemas) -> Book
 
 async def update_book_db(
     session: AsyncSession,
-    book: Book,
+    book_id: int,
     book_update: Union[BookUpdateSchemas, BookUpdatePartialSchemas],
     partial: bool = False,
-) -> Book:
+) -> Optional[Book]:
     logger.info("Start update book")
+    values: dict = book_update.model_dump(exclude_unset=partial)
     try:
-        for name, value in book_update.model_dump(exclude_unset=partial).items():
-            setattr(book, name, value)
-        await session.commit()
+        Book(**values)
     except ValueError as exc:
         logger.exception("Error in value %s", exc)
         raise ErrorInData(exc)
+
+    # пустой PATCH: UPDATE без SET невозможен, книга не меняется
+    if not values:
+        try:
+            return await session.get(Book, book_id)
+        except SQLAlchemyError as exc:
+            logger.exception("Error in data base %s", exc)
+            raise ExceptDB(exc)
+
+    stmt = update(Book).where(Book.id == book_id).values(**values).returning(Book)
+    try:
+        result: Result = await session.execute(stmt)
+        book: Optional[Book] = result.scalars().one_or_none()
+        await session.commit()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
+        await session.rollback()
         raise ExceptDB(exc)
     return book
 
 
 async def delete_book_db(session: AsyncSession, book: Book) -> None:
-    logger.info("Delete book by id %d" % book.id)
+    logger.info("Delete book by id %d", book.id)
     try:
         await session.delete(book)
         await session.commit()
@@ -75,9 +132,215 @@ async def delete_book_db(session: AsyncSession, book: Book) -> None:
 async def get_books(session: AsyncSession) -> list[Book]:
     logger.info("Getting a list of books")
     try:
-        stmt = select(Book).order_by(Book.id)
-        result: Result = await session.execute(stmt)
+        result: Result = await session.execute(stmt_books)
         books = result.scalars().all()
     except SQLAlchemyError as exc:
         logger.exception("Error in data base %s", exc)
     return list(books)
+
+
+def parse_sort(sort: BookSort) -> tuple[str, bool]:
+    """
+    Разбирает ключ сортировки вида "title" / "-title"
+    :param sort: ключ сортировки
+    :type sort: BookSort
+    :rtype: tuple[str, bool]
+    :return: имя поля и признак сортировки по убыванию
+    """
+    return sort.lstrip("-"), sort.startswith("-")
+
+
+def book_filter_conditions(filters: BookFilterSchemas) -> list[ColumnElement[bool]]:
+    """
+    Условия отбора книг. Каждому фильтру, кроме available=false, соответствует
+    индекс (см. миграцию edit_table_books_add_filter_indexes)
+    :param filters: фильтры
+    :type filters: BookFilterSchemas
+    :rtype: list[ColumnElement[bool]]
+    """
+    conditions: list[ColumnElement[bool]] = []
+    if filters.author is not None:
+        conditions.append(Book.author == filters.author)
+    if filters.title_prefix is not None:
+        prefix: str = filters.title_prefix
+        # побайтовое сравнение (~>=~, ~<~) использует индекс varchar_pattern_ops
+        # и при обобщенном плане, LIKE уточняет результат
+        conditions.append(Book.title.op("~>=~")(prefix))
+        if ord(prefix[-1]) < 0x10FFFF:
+            conditions.append(
+                Book.title.op("~<~")(prefix[:-1] + chr(ord(prefix[-1]) + 1))
+            )
+        conditions.append(Book.title.startswith(prefix, autoescape=True))
+    if filters.release_from is not None:
+        conditions.append(Book.release_date >= filters.release_from)
+    if filters.release_to is not None:
+        conditions.append(Book.release_date <= filters.release_to)
+    if filters.has_isbn is not None:
+        conditions.append(
+            Book.isbn.is_not(None) if filters.has_isbn else Book.isbn.is_(None)
+        )
+    if filters.available is not None:
+        conditions.append(BOOK_AVAILABLE if filters.available else BOOK_UNAVAILABLE)
+    return conditions
+
+
+def books_rows_stmt(
+    sort: BookSort = "id",
+    limit: Optional[int] = None,
+    after: Optional[tuple[Any, int]] = None,
+    filters: Optional[BookFilterSchemas] = None,
+) -> Select:
+    """
+    Запрос списка книг (параметры - как у get_books_rows)
+    :rtype: Select
+    """
+    conditions = book_filter_conditions(filters) if filters is not None else []
+    if sort == "id" and limit is None and after is None and not conditions:
+        return stmt_book_rows
+    field, descending = parse_sort(sort)
+    column = SORT_COLUMNS[field]
+    stmt = (
+        select(*BOOK_COLUMNS)
+        .where(*conditions)
+        .order_by(*keyset_order(column, Book.id, descending))
+    )
+    if after is not None:
+        stmt = stmt.where(keyset_condition(column, Book.id, descending, *after))
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+
+async def get_books_rows(
+    session: AsyncSession,
+    sort: BookSort = "id",
+    limit: Optional[int] = None,
+    after: Optional[tuple[Any, int]] = None,
+    filters: Optional[BookFilterSchemas] = None,
+) -> list[Row]:
+    """
+    Список книг (строки Core-запроса) с фильтрами и keyset-пагинацией
+    :param session: сессия БД
+    :type session: AsyncSession
+    :param sort: ключ сортировки (id - тай-брейкер для равных значений)
+    :type sort: BookSort
+    :param limit: размер страницы (возвращается до limit + 1 строк, лишняя
+    строка - признак следующей страницы), None - весь каталог
+    :type limit: Optional[int]
+    :param after: значение ключа сортировки и id последней строки
+    предыдущей страницы (из курсора)
+    :type after: Optional[tuple[Any, int]]
+    :param filters: фильтры
+    :type filters: Optional[BookFilterSchemas]
+    :rtype: list[Row]
+    """
+    logger.info("Getting a list of books (rows)")
+    stmt = books_rows_stmt(sort=sort, limit=limit, after=after, filters=filters)
+    try:
+        result: Result = await session.execute(stmt)
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB(exc)
+    return list(result.all())
+
+
+async def get_book_row(session: AsyncSession, book_id: int) -> Optional[Row]:
+    logger.info("Getting book row by id %d", book_id)
+    result: Result = await session.execute(stmt_book_row, {"book_id": book_id})
+    return result.one_or_none()
+
+
+async def search_books_rows(
+    session: AsyncSession,
+    query: str,
+    available: bool = False,
+    limit: int = 20,
+    after: Optional[tuple[Any, int]] = None,
+) -> list[Row]:
+    """
+    Полнотекстовый поиск по названию, автору и описанию (индекс GIN по
+    search_vector), результаты упорядочены по релевантности
+    :param session: сессия БД
+    :type session: AsyncSession
+    :param query: строка поиска (синтаксис websearch_to_tsquery)
+    :type query: str
+    :param available: только книги в наличии (count > 0)
+    :type available: bool
+    :param limit: размер страницы (возвращается до limit + 1 строк)
+    :type limit: int
+    :param after: rank и id последней строки предыдущей страницы
+    :type after: Optional[tuple[Any, int]]
+    :rtype: list[Row]
+    """
+    logger.info("Search books: %s", query)
+    ts_query = func.websearch_to_tsquery(
+        literal_column(f"'{SEARCH_CONFIG}'::regconfig"), query
+    )
+    rank = func.ts_rank(Book.search_vector, ts_query)
+    stmt = (
+        select(*SEARCH_COLUMNS, rank.label("rank"))
+        .where(Book.search_vector.bool_op("@@")(ts_query))
+        .order_by(*keyset_order(rank, Book.id, descending=True))
+        .limit(limit + 1)
+    )
+    if available:
+        stmt = stmt.where(BOOK_AVAILABLE)
+    if after is not None:
+        stmt = stmt.where(keyset_condition(rank, Book.id, True, *after))
+    try:
+        result: Result = await session.execute(stmt)
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB(exc)
+    return list(result.all())
+
+
+async def fuzzy_books_rows(
+    session: AsyncSession,
+    query: str,
+    threshold: float,
+    limit: int,
+) -> list[Row]:
+    """
+    Нечеткий поиск по названию и автору (pg_trgm, индексы GIN gin_trgm_ops):
+    устойчив к опечаткам, результаты упорядочены по сходству
+    :param session: сессия БД
+    :type session: AsyncSession
+    :param query: строка поиска
+    :type query: str
+    :param threshold: минимальное сходство (word_similarity) от 0 до 1
+    :type threshold: float
+    :param limit: максимальное число результатов
+    :type limit: int
+    :rtype: list[Row]
+    """
+    logger.info("Fuzzy search books: %s", query)
+    score = func.greatest(
+        func.word_similarity(query, Book.title),
+        func.word_similarity(query, Book.author),
+    )
+    stmt = (
+        select(*BOOK_COLUMNS, score.label("score"))
+        .where(
+            or_(
+                literal(query).bool_op("<%")(Book.title),
+                literal(query).bool_op("<%")(Book.author),
+            )
+        )
+        .order_by(score.desc(), Book.id)
+        .limit(limit)
+    )
+    try:
+        # оператор <% берет порог из настройки (is_local - до конца транзакции)
+        await session.execute(
+            select(
+                func.set_config(
+                    "pg_trgm.word_similarity_threshold", str(threshold), True
+                )
+            )
+        )
+        result: Result = await session.execute(stmt)
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB(exc)
+    return list(result.all())
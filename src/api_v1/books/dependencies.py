@@ -1,22 +1,37 @@
-from typing import Annotated, TYPE_CHECKING
-from fastapi import Path, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, Optional
+from fastapi import Path, Depends, HTTPException, Query, status
 
-from src.core.database import get_async_session
-from src.api_v1.books.crud import get_book
-
-if TYPE_CHECKING:
-    from src.models.book import Book
+from src.core.loader import BatchLoader, get_loader
+from src.models.book import Book
+from src.api_v1.books.schemas import BookFilterSchemas
 
 
 async def book_by_id(
     book_id: Annotated[int, Path],
-    session: AsyncSession = Depends(get_async_session),
-) -> "Book":
-    book = await get_book(session=session, book_id=book_id)
+    loader: BatchLoader = Depends(get_loader),
+) -> Book:
+    book: Optional[Book] = await loader.load(Book, book_id)
     if book:
         return book
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Book {book_id} not found!",
     )
+
+
+async def book_filters(
+    author: Annotated[Optional[str], Query(max_length=100)] = None,
+    title_prefix: Annotated[Optional[str], Query(min_length=1, max_length=100)] = None,
+    release_from: Annotated[Optional[int], Query(ge=1000, le=9999)] = None,
+    release_to: Annotated[Optional[int], Query(ge=1000, le=9999)] = None,
+    has_isbn: Optional[bool] = None,
+    available: Optional[bool] = None,
+) -> BookFilterSchemas:
+    return BookFilterSchemas(
+        author=author,
+        title_prefix=title_prefix,
+        release_from=release_from,
+        release_to=release_to,
+        has_isbn=has_isbn,
+        available=available,
+    )
@@ -0,0 +1,398 @@
+import codecs
+import csv
+import logging
+from typing import AsyncIterator, Literal, Optional, Union
+
+import asyncpg
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    literal_column,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.schema import CreateTable
+
+from src.models.book import Book
+from src.api_v1.books.schemas import (
+    BookCreateSchemas,
+    BookImportErrorSchemas,
+    BookImportReportSchemas,
+)
+from src.core.config import setting
+from src.core.exceptions import ErrorInData, ExceptDB
+
+logger = logging.getLogger(__name__)
+
+ImportFormat = Literal["csv", "jsonl"]
+
+# строка файла: номер строки и данные книги или список ошибок разбора
+ImportRecord = tuple[int, Union[dict, list[str]]]
+
+IMPORT_COLUMNS: list[str] = ["title", "author", "release_date", "isbn", "count"]
+REQUIRED_COLUMNS: set[str] = {"title", "author"}
+# колонки, обновляемые при совпадении ISBN
+UPSERT_COLUMNS: list[str] = ["title", "author", "release_date"]
+# верхняя граница INTEGER (int4) в PostgreSQL
+INT4_MAX: int = 2**31 - 1
+
+# промежуточная таблица: COPY пачки, затем слияние с books одним запросом
+staging = Table(
+    "books_import",
+    MetaData(),
+    Column("line", Integer, nullable=False),
+    Column("title", String(100), nullable=False),
+    Column("author", String(100), nullable=False),
+    Column("release_date", Integer),
+    Column("isbn", String(17)),
+    Column("count", Integer, nullable=False),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+STAGING_COLUMNS: list[str] = [column.name for column in staging.columns]
+
+
+def _merge_by_isbn_stmt():
+    # при повторе ISBN в пачке побеждает последняя строка файла
+    latest = (
+        select(*(staging.c[name] for name in IMPORT_COLUMNS))
+        .where(staging.c.isbn.is_not(None))
+        .distinct(staging.c.isbn)
+        .order_by(staging.c.isbn, staging.c.line.desc())
+    )
+    upsert = insert(Book).from_select(IMPORT_COLUMNS, latest)
+    # count - число доступных экземпляров (его меняют выдача и возврат),
+    # импорт каталога его не перезаписывает; поля, которых нет в строке
+    # файла, сохраняют прежние значения
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[Book.isbn],
+        set_={
+            name: func.coalesce(upsert.excluded[name], Book.__table__.c[name])
+            for name in UPSERT_COLUMNS
+        },
+    ).returning(literal_column("xmax = 0").label("inserted"))
+    merged = upsert.cte("merged")
+    return select(
+        func.count().filter(merged.c.inserted),
+        func.count().filter(~merged.c.inserted),
+    )
+
+
+stmt_merge_by_isbn = _merge_by_isbn_stmt()
+stmt_insert_without_isbn = insert(Book).from_select(
+    IMPORT_COLUMNS,
+    select(*(staging.c[name] for name in IMPORT_COLUMNS))
+    .where(staging.c.isbn.is_(None))
+    .order_by(staging.c.line),
+)
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    tail: str = ""
+    async for chunk in chunks:
+        lines: list[str] = (tail + decoder.decode(chunk)).split("\n")
+        tail = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    tail += decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def _in_quoted_field(line: str, in_quotes: bool) -> bool:
+    """
+    Продолжается ли поле в кавычках после строки (правила диалекта excel
+    модуля csv: кавычка открывает поле только в его начале, "" внутри
+    поля - экранированная кавычка, остальные кавычки - обычные символы)
+    :param line: строка файла
+    :type line: str
+    :param in_quotes: строка начинается внутри поля в кавычках
+    :type in_quotes: bool
+    :rtype: bool
+    """
+    if not in_quotes and '"' not in line:
+        return False
+    field_start: bool = not in_quotes
+    pos, size = 0, len(line)
+    while pos < size:
+        char: str = line[pos]
+        if in_quotes:
+            if char == '"':
+                if line.startswith('"', pos + 1):
+                    pos += 1
+                else:
+                    in_quotes = False
+        elif char == '"' and field_start:
+            in_quotes = True
+            field_start = False
+        else:
+            field_start = char == ","
+        pos += 1
+    return in_quotes
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+    """
+    Разбирает CSV с заголовком (колонки title, author, release_date, isbn,
+    count; пустое значение - значение по умолчанию) по мере поступления данных
+    :param chunks: блоки файла
+    :type chunks: AsyncIterator[bytes]
+    :rtype: AsyncIterator[ImportRecord]
+    :raises ErrorInData: в заголовке нет обязательных колонок
+    """
+    header: Optional[list[str]] = None
+    pending: list[str] = []
+    in_quotes: bool = False
+    start: int = 0
+    line_no: int = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not pending:
+            start = line_no
+        pending.append(line)
+        in_quotes = _in_quoted_field(line, in_quotes)
+        if in_quotes:
+            continue
+        lines, pending = pending, []
+        reader = csv.reader(lines)
+        record_start: int = start
+        while True:
+            try:
+                values: Optional[list[str]] = next(reader, None)
+            except csv.Error as exc:
+                yield record_start, [f"csv: {exc}"]
+                break
+            if values is None:
+                break
+            line_start, record_start = record_start, start + reader.line_num
+            if not any(value.strip() for value in values):
+                continue
+            if header is None:
+                header = [value.strip() for value in values]
+                missing: set[str] = REQUIRED_COLUMNS - set(header)
+                if missing:
+                    raise ErrorInData(
+                        f"CSV header has no columns: {', '.join(sorted(missing))}"
+                    )
+                continue
+            if len(values) != len(header):
+                yield line_start, [
+                    f"csv: expected {len(header)} columns, got {len(values)}"
+                ]
+                continue
+            yield line_start, {
+                name: value for name, value in zip(header, values) if value != ""
+            }
+    if pending:
+        yield start, ["csv: unterminated quoted field"]
+
+
+async def iter_jsonl_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[ImportRecord]:
+    """
+    Разбирает JSON Lines (один объект книги в строке) по мере поступления данных
+    :param chunks: блоки файла
+    :type chunks: AsyncIterator[bytes]
+    :rtype: AsyncIterator[ImportRecord]
+    """
+    line_no: int = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            data = orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            yield line_no, [f"json: {exc}"]
+            continue
+        if not isinstance(data, dict):
+            yield line_no, ["json: expected an object"]
+            continue
+        yield line_no, data
+
+
+def read_records(
+    file_format: ImportFormat, chunks: AsyncIterator[bytes]
+) -> AsyncIterator[ImportRecord]:
+    """
+    Разбор файла импорта в зависимости от формата
+    :param file_format: формат файла
+    :type file_format: ImportFormat
+    :param chunks: блоки файла
+    :type chunks: AsyncIterator[bytes]
+    :rtype: AsyncIterator[ImportRecord]
+    """
+    if file_format == "jsonl":
+        return iter_jsonl_records(chunks)
+    return iter_csv_records(chunks)
+
+
+def validate_book(data: dict) -> Union[BookCreateSchemas, list[str]]:
+    """
+    Проверяет строку импорта по правилам BookCreateSchemas и модели Book
+    :param data: данные книги
+    :type data: dict
+    :rtype: Union[BookCreateSchemas, list[str]]
+    :return: книга или список ошибок
+    """
+    try:
+        book = BookCreateSchemas.model_validate(data)
+        Book.validate_isbn(None, "isbn", book.isbn)
+    except ValidationError as exc:
+        return [
+            f"{'.'.join(map(str, error['loc']))}: {error['msg']}"
+            for error in exc.errors()
+        ]
+    except ValueError as exc:
+        return [f"isbn: {exc}"]
+    # PostgreSQL не хранит символ NUL в строках, COPY упал бы на всей пачке
+    for name in ("title", "author", "isbn"):
+        value: Optional[str] = getattr(book, name)
+        if value is not None and "\x00" in value:
+            return [f"{name}: NUL character is not allowed"]
+    # COPY не приводит значение к int4 и падает на всей загрузке
+    if book.count > INT4_MAX:
+        return [f"count: Input should be less than or equal to {INT4_MAX}"]
+    return book
+
+
+class BookImporter:
+    """
+    Загрузка книг пачками: строки проверяются, корректные копируются (COPY)
+    во временную таблицу и сливаются с books (upsert по ISBN без изменения
+    count, книги без ISBN добавляются), ошибочные попадают в отчет и загрузку не прерывают.
+    Вся загрузка выполняется в одной транзакции
+    """
+
+    def __init__(self, session: AsyncSession, chunk_size: int, max_errors: int) -> None:
+        self.session = session
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.report = BookImportReportSchemas()
+        self._chunk: list[tuple] = []
+        self._driver_connection: Optional[asyncpg.Connection] = None
+
+    def _error(self, line: int, errors: list[str]) -> None:
+        self.report.failed += 1
+        if len(self.report.errors) < self.max_errors:
+            self.report.errors.append(BookImportErrorSchemas(line=line, errors=errors))
+
+    async def add(self, line: int, data: Union[dict, list[str]]) -> None:
+        """
+        Добавляет строку файла
+        :param line: номер строки
+        :type line: int
+        :param data: данные книги или ошибки разбора строки
+        :type data: Union[dict, list[str]]
+        """
+        self.report.received += 1
+        if isinstance(data, list):
+            self._error(line, data)
+            return
+        book: Union[BookCreateSchemas, list[str]] = validate_book(data)
+        if isinstance(book, list):
+            self._error(line, book)
+            return
+        self._chunk.append(
+            (line, book.title, book.author, book.release_date, book.isbn, book.count)
+        )
+        if len(self._chunk) >= self.chunk_size:
+            await self.flush()
+
+    async def _staging_connection(self) -> asyncpg.Connection:
+        if self._driver_connection is None:
+            connection: AsyncConnection = await self.session.connection()
+            await connection.execute(CreateTable(staging))
+            raw = await connection.get_raw_connection()
+            self._driver_connection = raw.driver_connection
+        return self._driver_connection
+
+    async def flush(self) -> None:
+        """
+        Загружает накопленную пачку
+        """
+        if not self._chunk:
+            return
+        chunk, self._chunk = self._chunk, []
+        driver_connection: asyncpg.Connection = await self._staging_connection()
+        try:
+            await driver_connection.copy_records_to_table(
+                staging.name, records=chunk, columns=STAGING_COLUMNS
+            )
+        except (OverflowError, ValueError) as exc:
+            # значение, которое asyncpg не смог закодировать для COPY
+            raise ExceptDB(exc) from exc
+        result: Result = await self.session.execute(stmt_merge_by_isbn)
+        inserted, updated = result.one()
+        result = await self.session.execute(stmt_insert_without_isbn)
+        self.report.inserted += inserted + result.rowcount
+        self.report.updated += updated
+        await self.session.execute(text(f"TRUNCATE {staging.name}"))
+        logger.info(
+            "Imported chunk of %d books (%d received so far)",
+            len(chunk),
+            self.report.received,
+        )
+
+
+async def import_books(
+    session: AsyncSession,
+    records: AsyncIterator[ImportRecord],
+    chunk_size: Optional[int] = None,
+    max_errors: Optional[int] = None,
+) -> BookImportReportSchemas:
+    """
+    Импорт книг из потока строк файла
+    :param session: сессия
+    :type session: AsyncSession
+    :param records: строки файла (см. read_records)
+    :type records: AsyncIterator[ImportRecord]
+    :param chunk_size: строк в пачке (по умолчанию book_import.chunk_size)
+    :type chunk_size: Optional[int]
+    :param max_errors: ошибок в отчете (по умолчанию book_import.max_errors)
+    :type max_errors: Optional[int]
+    :rtype: BookImportReportSchemas
+    :raises ErrorInData: файл не может быть разобран
+    :raises ExceptDB: ошибка базы данных (изменения отменены)
+    """
+    logger.info("Start import books")
+    importer = BookImporter(
+        session=session,
+        chunk_size=chunk_size or setting.book_import.chunk_size,
+        max_errors=setting.book_import.max_errors if max_errors is None else max_errors,
+    )
+    try:
+        async for line, data in records:
+            await importer.add(line, data)
+        await importer.flush()
+        await session.commit()
+    except (SQLAlchemyError, asyncpg.PostgresError) as exc:
+        logger.exception("Error in data base %s", exc)
+        await session.rollback()
+        raise ExceptDB(exc)
+    except ExceptDB as exc:
+        logger.exception("Error in data base %s", exc)
+        await session.rollback()
+        raise
+    except ErrorInData:
+        await session.rollback()
+        raise
+    report: BookImportReportSchemas = importer.report
+    logger.info(
+        "Import books finished: %d received, %d inserted, %d updated, %d failed",
+        report.received,
+        report.inserted,
+        report.updated,
+        report.failed,
+    )
+    return report
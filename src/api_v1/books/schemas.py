@@ -43,7 +43,41 @@ class BookCreateSchemas(BookBaseSchemas):
     pass
 
 
+class BookFilterSchemas(BaseModel):
+    author: Optional[str] = None
+    title_prefix: Optional[str] = None
+    release_from: Optional[int] = None
+    release_to: Optional[int] = None
+    has_isbn: Optional[bool] = None
+    available: Optional[bool] = None
+
+
 class OutBookSchemas(BookBaseSchemas):
     id: int
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class OutBookSearchSchemas(OutBookSchemas):
+    description: Optional[str] = None
+    rank: float
+
+
+class OutBookFuzzySchemas(OutBookSchemas):
+    score: float
+
+
+class BookImportErrorSchemas(BaseModel):
+    line: int = Field(description="Номер строки файла (для CSV - первая строка записи)")
+    errors: list[str]
+
+
+class BookImportReportSchemas(BaseModel):
+    received: int = 0
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list[BookImportErrorSchemas] = Field(
+        default_factory=list,
+        description="Первые book_import.max_errors ошибок",
+    )
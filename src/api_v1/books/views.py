@@ -1,44 +1,61 @@
-from typing import TYPE_CHECKING
+from typing import Annotated, Any, Optional
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Path, Query, Request, Response, status
 from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.database import get_async_session
+from src.core.config import setting
+from src.core.database import get_async_session, get_read_session
+from src.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from src.core.principal_cache import Principal
+from src.core.responses import row_response, rows_response
+from src.core.rate_limit import RateLimit
 from src.core.exceptions import (
     ErrorInData,
     ExceptDB,
+    InvalidCursor,
 )
 from src.api_v1.books.crud import (
+    BookSort,
     create_book,
-    get_books,
+    get_book_row,
+    get_books_rows,
     update_book_db,
     delete_book_db,
+    parse_sort,
+    search_books_rows,
+    fuzzy_books_rows,
 )
-from src.api_v1.books.dependencies import book_by_id
+from src.api_v1.books.dependencies import book_by_id, book_filters
+from src.api_v1.books.importer import ImportFormat, import_books, read_records
 from src.api_v1.users.depends import (
     current_superuser_user,
     current_user_authorization,
 )
 from src.models.book import Book
 from src.api_v1.books.schemas import (
+    BookFilterSchemas,
+    BookImportReportSchemas,
     BookUpdateSchemas,
     BookUpdatePartialSchemas,
     BookCreateSchemas,
     OutBookSchemas,
+    OutBookSearchSchemas,
+    OutBookFuzzySchemas,
 )
 
-if TYPE_CHECKING:
-    from src.models.user import User
-
-router = APIRouter(prefix="/books", tags=["Books"])
+router = APIRouter(
+    prefix="/books",
+    tags=["Books"],
+    dependencies=[Depends(RateLimit("books"))],
+)
 
 
 @router.post("/new", response_model=OutBookSchemas, status_code=status.HTTP_201_CREATED)
 async def new_book(
     book: BookCreateSchemas,
     session: AsyncSession = Depends(get_async_session),
-    user: "User" = Depends(current_superuser_user),
+    user: Principal = Depends(current_superuser_user),
 ):
     try:
         result: Book = await create_book(session=session, book_in=book)
@@ -56,35 +73,179 @@ async def new_book(
         return result
 
 
+@router.post(
+    "/import",
+    response_model=BookImportReportSchemas,
+    status_code=status.HTTP_200_OK,
+)
+async def import_books_file(
+    request: Request,
+    file_format: Annotated[ImportFormat, Query(alias="format")] = "csv",
+    session: AsyncSession = Depends(get_async_session),
+    user: Principal = Depends(current_superuser_user),
+):
+    # тело запроса - файл CSV (с заголовком) или JSON Lines, читается потоком
+    try:
+        report: BookImportReportSchemas = await import_books(
+            session=session, records=read_records(file_format, request.stream())
+        )
+    except ExceptDB:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Error in data bases",
+        )
+    except ErrorInData as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return report
+
+
 @router.get(
     "/list",
     response_model=list[OutBookSchemas],
     status_code=status.HTTP_200_OK,
 )
 async def get_list_books(
-    session: AsyncSession = Depends(get_async_session),
-    user: "User" = Depends(current_user_authorization),
+    response: Response,
+    limit: Annotated[
+        Optional[int], Query(ge=1, le=setting.pagination.max_limit)
+    ] = None,
+    cursor: Annotated[Optional[str], Query(alias="next")] = None,
+    sort: BookSort = "id",
+    filters: BookFilterSchemas = Depends(book_filters),
+    session: AsyncSession = Depends(get_read_session),
+    user: Principal = Depends(current_user_authorization),
 ):
-    return await get_books(session=session)
+    after: Optional[tuple[Any, int]] = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, sort)
+        except InvalidCursor as exp:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{exp}",
+            )
+        if limit is None:
+            limit = setting.pagination.default_limit
+
+    try:
+        rows = await get_books_rows(
+            session=session, sort=sort, limit=limit, after=after, filters=filters
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+
+    field, _ = parse_sort(sort)
+    cursor_next: Optional[str] = next_cursor(rows, limit, sort, field)
+    headers = {NEXT_CURSOR_HEADER: cursor_next} if cursor_next is not None else None
+    return rows_response(rows[:limit], headers=headers, response=response)
+
+
+@router.get(
+    "/search",
+    response_model=list[OutBookSearchSchemas],
+    status_code=status.HTTP_200_OK,
+)
+async def search_books(
+    response: Response,
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    available: bool = False,
+    limit: Annotated[
+        int, Query(ge=1, le=setting.pagination.max_limit)
+    ] = setting.pagination.default_limit,
+    cursor: Annotated[Optional[str], Query(alias="next")] = None,
+    session: AsyncSession = Depends(get_read_session),
+    user: Principal = Depends(current_user_authorization),
+):
+    after: Optional[tuple[Any, int]] = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, "rank")
+        except InvalidCursor as exp:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{exp}",
+            )
+
+    try:
+        rows = await search_books_rows(
+            session=session, query=q, available=available, limit=limit, after=after
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+
+    cursor_next: Optional[str] = next_cursor(rows, limit, "rank", "rank")
+    headers = {NEXT_CURSOR_HEADER: cursor_next} if cursor_next is not None else None
+    return rows_response(rows[:limit], headers=headers, response=response)
+
+
+@router.get(
+    "/fuzzy",
+    response_model=list[OutBookFuzzySchemas],
+    status_code=status.HTTP_200_OK,
+)
+async def fuzzy_books(
+    response: Response,
+    q: Annotated[
+        str,
+        Query(min_length=setting.fuzzy_search.min_query_length, max_length=100),
+    ],
+    threshold: Annotated[
+        float, Query(ge=0.3, le=1.0)
+    ] = setting.fuzzy_search.threshold,
+    limit: Annotated[
+        int, Query(ge=1, le=setting.fuzzy_search.max_limit)
+    ] = setting.fuzzy_search.default_limit,
+    session: AsyncSession = Depends(get_read_session),
+    user: Principal = Depends(current_user_authorization),
+):
+    try:
+        rows = await fuzzy_books_rows(
+            session=session, query=q, threshold=threshold, limit=limit
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{exp}",
+        )
+    return rows_response(rows, response=response)
 
 
 @router.get("/{book_id}/", response_model=OutBookSchemas)
 async def get_book(
-    user: "User" = Depends(current_user_authorization),
-    book: Book = Depends(book_by_id),
+    response: Response,
+    book_id: Annotated[int, Path],
+    user: Principal = Depends(current_user_authorization),
+    session: AsyncSession = Depends(get_read_session),
 ):
-    return book
+    row = await get_book_row(session=session, book_id=book_id)
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Book {book_id} not found!",
+        )
+    return row_response(row, response=response)
 
 
 @router.put("/{book_id}/", response_model=OutBookSchemas)
 async def update_book_put(
+    book_id: Annotated[int, Path],
     book_update: BookUpdateSchemas,
-    user: "User" = Depends(current_superuser_user),
-    book: Book = Depends(book_by_id),
+    user: Principal = Depends(current_superuser_user),
     session: AsyncSession = Depends(get_async_session),
 ):
     try:
-        res = await update_book_db(session=session, book=book, book_update=book_update)
+        res = await update_book_db(
+            session=session, book_id=book_id, book_update=book_update
+        )
     except ErrorInData as exp:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -95,20 +256,24 @@ async def update_book_put(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"{exp}",
         )
-    else:
-        return res
+    if res is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Book {book_id} not found!",
+        )
+    return res
 
 
 @router.patch("/{book_id}/", response_model=OutBookSchemas)
 async def update_book_patch(
+    book_id: Annotated[int, Path],
     book_update: BookUpdatePartialSchemas,
-    user: "User" = Depends(current_superuser_user),
-    book: Book = Depends(book_by_id),
+    user: Principal = Depends(current_superuser_user),
     session: AsyncSession = Depends(get_async_session),
 ):
     try:
         res = await update_book_db(
-            session=session, book=book, book_update=book_update, partial=True
+            session=session, book_id=book_id, book_update=book_update, partial=True
         )
     except ErrorInData as exp:
         raise HTTPException(
@@ -120,13 +285,17 @@ async def update_book_patch(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"{exp}",
         )
-    else:
-        return res
+    if res is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Book {book_id} not found!",
+        )
+    return res
 
 
 @router.delete("/{book_id}/", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_book(
-    user: "User" = Depends(current_superuser_user),
+    user: Principal = Depends(current_superuser_user),
     book: Book = Depends(book_by_id),
     session: AsyncSession = Depends(get_async_session),
 ) -> None:
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class PoolStatsSchemas(BaseModel):
+    name: str
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    waiting: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class StatementCacheSchemas(BaseModel):
+    hits: int
+    misses: int
+
+
+class StatementStatsSchemas(BaseModel):
+    hit_rate: float
+    statements: dict[str, StatementCacheSchemas]
+
+
+class DeadlineStatsSchemas(BaseModel):
+    deadline_exceeded: int
+    statement_timeouts: int
+    lock_timeouts: int
+
+
+class LoadStatsSchemas(BaseModel):
+    in_flight: int
+    shed: dict[str, int]
+
+
+class ProfileSchemas(BaseModel):
+    name: str
+    size: int
+    created: datetime
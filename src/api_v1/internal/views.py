@@ -0,0 +1,95 @@
+from dataclasses import asdict
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Depends, status
+from fastapi.exceptions import HTTPException
+from fastapi.responses import FileResponse
+
+from src.core.database import engine, replica_engines
+from src.core.deadline import deadline_stats
+from src.core.load_shedding import load_stats
+from src.core.principal_cache import Principal
+from src.core.profiling import list_profiles, profile_path
+from src.core.statements import statements
+from src.api_v1.users.depends import current_superuser_user
+from src.api_v1.internal.schemas import (
+    DeadlineStatsSchemas,
+    LoadStatsSchemas,
+    PoolStatsSchemas,
+    ProfileSchemas,
+    StatementStatsSchemas,
+)
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+
+@router.get(
+    "/pool",
+    response_model=list[PoolStatsSchemas],
+    status_code=status.HTTP_200_OK,
+)
+async def get_pool_stats(
+    user: Principal = Depends(current_superuser_user),
+):
+    return [engine.pool.snapshot()] + [
+        replica.pool.snapshot() for replica in replica_engines
+    ]
+
+
+@router.get(
+    "/statements",
+    response_model=StatementStatsSchemas,
+    status_code=status.HTTP_200_OK,
+)
+async def get_statement_stats(
+    user: Principal = Depends(current_superuser_user),
+):
+    return statements.stats()
+
+
+@router.get(
+    "/deadlines",
+    response_model=DeadlineStatsSchemas,
+    status_code=status.HTTP_200_OK,
+)
+async def get_deadline_stats(
+    user: Principal = Depends(current_superuser_user),
+):
+    return asdict(deadline_stats)
+
+
+@router.get(
+    "/load",
+    response_model=LoadStatsSchemas,
+    status_code=status.HTTP_200_OK,
+)
+async def get_load_stats(
+    user: Principal = Depends(current_superuser_user),
+):
+    return {"in_flight": load_stats.in_flight, "shed": dict(load_stats.shed)}
+
+
+@router.get(
+    "/profiles",
+    response_model=list[ProfileSchemas],
+    status_code=status.HTTP_200_OK,
+)
+async def get_profiles(
+    user: Principal = Depends(current_superuser_user),
+):
+    return list_profiles()
+
+
+@router.get("/profiles/{name}", status_code=status.HTTP_200_OK)
+async def get_profile(
+    name: str,
+    user: Principal = Depends(current_superuser_user),
+):
+    path: Optional[Path] = profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {name} not found!",
+        )
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -2,9 +2,10 @@ import logging
 from typing import Optional
 from datetime import datetime
 
-from sqlalchemy import select, and_
-from sqlalchemy.orm import selectinload
-from sqlalchemy.engine import Result
+from sqlalchemy import bindparam, select, update, and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.engine import Result, Row
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,22 +16,61 @@ from src.api_v1.library.schemas import (
     ReceivingCreateSchemas,
 )
 from src.core.exceptions import ErrorInData, ExceptDB
-from src.core.config import configure_logging
+from src.core.loader import BatchLoader
+from src.core.statements import statements
 
-configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
+stmt_active_receivings = statements.add(
+    "active_receivings",
+    select(ReceivingBook).where(
+        ReceivingBook.reader_id == bindparam("reader_id"),
+        ReceivingBook.return_date.is_(None),
+    ),
+)
+stmt_receiving = statements.add(
+    "receiving",
+    select(ReceivingBook)
+    .options(joinedload(ReceivingBook.book))
+    .filter(
+        and_(
+            ReceivingBook.reader_id == bindparam("reader_id"),
+            ReceivingBook.book_id == bindparam("book_id"),
+        )
+    ),
+)
+stmt_user_book_rows = statements.add(
+    "user_book_rows",
+    select(Book.title, Book.author, Book.release_date, Book.isbn)
+    .join(ReceivingBook, ReceivingBook.book_id == Book.id)
+    .where(
+        ReceivingBook.reader_id == bindparam("user_id"),
+        ReceivingBook.return_date.is_(None),
+    )
+    .order_by(ReceivingBook.id),
+)
+stmt_user_books = statements.add(
+    "user_books",
+    select(User)
+    .options(selectinload(User.books).joinedload(ReceivingBook.book))
+    .filter(User.id == bindparam("user_id")),
+)
+
 
 async def create_receiving(
     session: AsyncSession,
     borrow: ReceivingCreateSchemas,
+    loader: Optional[BatchLoader] = None,
 ) -> ReceivingBook:
     logger.info("Start create borrow book")
 
     user_id: int = borrow.model_dump()["reader_id"]
     book_id: int = borrow.model_dump()["book_id"]
 
-    book: Optional[Book] = await session.get(Book, book_id)
+    if loader is None:
+        loader = BatchLoader(session)
+    loader.prime(User, user_id)
+    book: Optional[Book] = await loader.load(Book, book_id)
     if book is None:
         logger.info("Not find book")
         raise ErrorInData("Not find book")
@@ -39,53 +79,71 @@ async def create_receiving(
         logger.info("These books are not available")
         raise ErrorInData("These books are not available")
 
-    user: Optional[User] = await session.get(User, user_id)
+    user: Optional[User] = await loader.load(User, user_id)
     if user is None:
         logger.info("Not find user")
         raise ErrorInData("Not find user")
 
-    stmt = select(ReceivingBook).where(
-        ReceivingBook.reader_id == user_id, ReceivingBook.return_date.is_(None)
+    result: Result = await session.execute(
+        stmt_active_receivings, {"reader_id": user_id}
     )
-    result: Result = await session.execute(stmt)
     books_user = result.scalars().all()
 
     logger.info(
-        "Количество книг у пользователя с id: %s - %s штук" % (user_id, len(books_user))
+        "Количество книг у пользователя с id: %s - %s штук", user_id, len(books_user)
     )
 
     if len(books_user) >= 3:
         logger.info("The user has 3 books")
         raise ErrorInData("The user has 3 books")
 
-    receiving_book = ReceivingBook(
-        book_id=book_id,
-        reader_id=user_id,
+    stmt_insert = (
+        insert(ReceivingBook)
+        .values(book_id=book_id, reader_id=user_id)
+        .on_conflict_do_nothing(constraint="idx_unique_reader_book")
+        .returning(ReceivingBook)
+    )
+    stmt_take = (
+        update(Book)
+        .where(Book.id == book_id, Book.count > 0)
+        .values(count=Book.count - 1)
+        .returning(Book.count)
     )
-
     try:
-        session.add(receiving_book)
-        book.count -= 1
+        result = await session.execute(stmt_insert)
+        receiving_book: Optional[ReceivingBook] = result.scalar_one_or_none()
+        if receiving_book is None:
+            await session.rollback()
+            logger.warning("The user already has this book")
+            raise ExceptDB("The user already has this book")
+
+        result = await session.execute(stmt_take)
+        if result.scalar_one_or_none() is None:
+            await session.rollback()
+            logger.info("These books are not available")
+            raise ErrorInData("These books are not available")
+
         await session.commit()
     except IntegrityError as exc:
         await session.rollback()
-        logger.warning("The user already has this book")
-        raise ExceptDB("The user already has this book")
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB(exc)
 
     return receiving_book
 
 
 async def return_receiving(
-    session: AsyncSession, receiving: ReceivingCreateSchemas
+    session: AsyncSession,
+    receiving: ReceivingCreateSchemas,
+    loader: Optional[BatchLoader] = None,
 ) -> str:
     logger.info("Start return book in library")
     user_id: int = receiving.model_dump()["reader_id"]
     book_id: int = receiving.model_dump()["book_id"]
 
-    stmt = select(ReceivingBook).filter(
-        and_(ReceivingBook.reader_id == user_id, ReceivingBook.book_id == book_id)
+    result: Result = await session.execute(
+        stmt_receiving, {"reader_id": user_id, "book_id": book_id}
     )
-    result: Result = await session.execute(stmt)
     books_user: ReceivingBook = result.scalars().first()
     if books_user is None:
         logger.info("The user does not have this book")
@@ -95,7 +153,9 @@ async def return_receiving(
         logger.info("The book has already been returned")
         raise ErrorInData("The book has already been returned")
 
-    book: Optional[Book] = await session.get(Book, book_id)
+    if loader is None:
+        loader = BatchLoader(session)
+    book: Optional[Book] = await loader.load(Book, book_id)
     if book is None:
         logger.info("Not find book")
         raise ErrorInData("Not find book")
@@ -112,15 +172,9 @@ async def return_receiving(
 
 
 async def get_books(session: AsyncSession, user_id: int) -> list[Book]:
-    logger.info("Getting a list of books user %s" % user_id)
+    logger.info("Getting a list of books user %s", user_id)
     try:
-        stmt = (
-            select(User)
-            .options(selectinload(User.books).joinedload(ReceivingBook.book))
-            .filter(User.id == user_id)
-        )
-
-        result: Result = await session.execute(stmt)
+        result: Result = await session.execute(stmt_user_books, {"user_id": user_id})
         user: User = result.scalars().first()
 
         list_book_user: list[Book] = list()
@@ -133,3 +187,15 @@ async def get_books(session: AsyncSession, user_id: int) -> list[Book]:
         raise ExceptDB("Error in data base")
 
     return list_book_user
+
+
+async def get_books_rows(session: AsyncSession, user_id: int) -> list[Row]:
+    logger.info("Getting a list of books user %s (rows)", user_id)
+    try:
+        result: Result = await session.execute(
+            stmt_user_book_rows, {"user_id": user_id}
+        )
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        raise ExceptDB("Error in data base")
+    return list(result.all())
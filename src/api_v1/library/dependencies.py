@@ -1,19 +1,15 @@
-from typing import Annotated, TYPE_CHECKING
+from typing import Annotated, Optional
 from fastapi import Path, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.database import get_async_session
-from src.api_v1.books.crud import get_book
-
-if TYPE_CHECKING:
-    from src.models.book import Book
+from src.core.loader import BatchLoader, get_loader
+from src.models.book import Book
 
 
 async def book_by_id(
     book_id: Annotated[int, Path],
-    session: AsyncSession = Depends(get_async_session),
-) -> "Book":
-    book = await get_book(session=session, book_id=book_id)
+    loader: BatchLoader = Depends(get_loader),
+) -> Book:
+    book: Optional[Book] = await loader.load(Book, book_id)
     if book:
         return book
     raise HTTPException(
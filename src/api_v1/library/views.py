@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Response, status
 from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.database import get_async_session
+from src.core.database import get_async_session, get_read_session
+from src.core.loader import BatchLoader, get_loader
+from src.core.metrics import metrics
+from src.core.principal_cache import Principal
+from src.core.responses import rows_response
+from src.core.rate_limit import RateLimit
 from src.core.exceptions import (
     ErrorInData,
     ExceptDB,
@@ -10,12 +15,11 @@ from src.core.exceptions import (
 from src.api_v1.library.crud import (
     create_receiving,
     return_receiving,
-    get_books,
+    get_books_rows,
 )
-from src.api_v1.users.depends import current_superuser_user, user_by_id
+from src.api_v1.users.depends import current_superuser_user, read_user_by_id
 
 from src.models.user import User
-from src.models.book import Book
 from src.models.library import ReceivingBook
 from src.api_v1.library.schemas import (
     ReceivingCreateSchemas,
@@ -24,7 +28,11 @@ from src.api_v1.library.schemas import (
     RecevingBookUserSchemas,
 )
 
-router = APIRouter(prefix="/library", tags=["Library"])
+router = APIRouter(
+    prefix="/library",
+    tags=["Library"],
+    dependencies=[Depends(RateLimit("library"))],
+)
 
 
 @router.post(
@@ -35,10 +43,13 @@ router = APIRouter(prefix="/library", tags=["Library"])
 async def borrow_book(
         borrow: ReceivingCreateSchemas,
         session: AsyncSession = Depends(get_async_session),
-        user: User = Depends(current_superuser_user),
+        user: Principal = Depends(current_superuser_user),
+        loader: BatchLoader = Depends(get_loader),
 ):
     try:
-        result: ReceivingBook = await create_receiving(session=session, borrow=borrow)
+        result: ReceivingBook = await create_receiving(
+            session=session, borrow=borrow, loader=loader
+        )
     except ExceptDB as exp:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -50,6 +61,7 @@ async def borrow_book(
             detail=f"{exp}",
         )
     else:
+        metrics.inc("library_borrows_total")
         return result
 
 
@@ -61,11 +73,12 @@ async def borrow_book(
 async def return_book(
         receiving: ReceivingCreateSchemas,
         session: AsyncSession = Depends(get_async_session),
-        user: User = Depends(current_superuser_user),
+        user: Principal = Depends(current_superuser_user),
+        loader: BatchLoader = Depends(get_loader),
 ):
     try:
         result: str = await return_receiving(
-            session=session, receiving=receiving
+            session=session, receiving=receiving, loader=loader
         )
     except ExceptDB as exp:
         raise HTTPException(
@@ -78,20 +91,22 @@ async def return_book(
             detail=f"{exp}",
         )
     else:
+        metrics.inc("library_returns_total")
         return ReceivingResultSchemas(result=result)
 
 
 @router.get("/{user_id}/", response_model=list[RecevingBookUserSchemas])
 async def get_book_user_by_id(
-    user: User = Depends(user_by_id),
-    session: AsyncSession = Depends(get_async_session),
+    response: Response,
+    user: User = Depends(read_user_by_id),
+    session: AsyncSession = Depends(get_read_session),
 ):
     try:
-        result: list[Book] = await get_books(session=session, user_id=user.id)
+        rows = await get_books_rows(session=session, user_id=user.id)
     except ExceptDB as exp:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"{exp}",
         )
 
-    return result
+    return rows_response(rows, response=response)
@@ -1,17 +1,24 @@
 import logging
 from typing import Optional, Union
 
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.engine import Result
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.config import configure_logging
+from src.core.jwt_utils import create_hash_password
+from src.core.statements import statements
+from src.core.principal_cache import (
+    Principal,
+    invalidation_notify,
+    principal_cache,
+    publish_invalidation,
+)
 from src.core.exceptions import (
     UniqueViolationError,
     NotFindUser,
     EmailInUse,
-    ErrorInData,
 )
 from src.models.user import User
 from src.api_v1.users.schemas import (
@@ -20,86 +27,134 @@ from src.api_v1.users.schemas import (
     UserUpdatePartialSchemas,
 )
 
-configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
+stmt_user_by_email = statements.add(
+    "user_by_email", select(User).where(User.email == bindparam("email"))
+)
+stmt_users = statements.add("users", select(User).order_by(User.id))
+
 
 async def get_user_from_db(session: AsyncSession, email: str) -> User:
-    logger.info("Start find user by username: %s" % email)
-    stmt = select(User).where(User.email == email)
-    res: Result = await session.execute(stmt)
+    logger.info("Start find user by username: %s", email)
+    res: Result = await session.execute(stmt_user_by_email, {"email": email})
     user: Optional[User] = res.scalars().one_or_none()
     if not user:
-        logger.info("User by name %s not find" % email)
+        logger.info("User by name %s not find", email)
         raise NotFindUser(f"Not find user by username {email}")
     logger.info("User has benn found")
     return user
 
 
 async def get_user_by_id(session: AsyncSession, id_user: int) -> Optional[User]:
-    logger.info("User request by id %d" % id_user)
+    logger.info("User request by id %d", id_user)
     return await session.get(User, id_user)
 
 
+async def get_principal_by_id(
+    session: AsyncSession, id_user: int
+) -> Optional[Principal]:
+    principal: Optional[Principal] = principal_cache.get(id_user)
+    if principal is not None:
+        return principal
+    user: Optional[User] = await get_user_by_id(session=session, id_user=id_user)
+    if user is None:
+        return None
+    principal = Principal(
+        id=user.id, is_superuser=user.is_superuser, version=user.version
+    )
+    principal_cache.put(principal)
+    return principal
+
+
 async def find_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
-    logger.info("User find by email %s" % email)
-    stmt = select(User).filter(User.email == email)
-    result: Result = await session.execute(stmt)
+    logger.info("User find by email %s", email)
+    result: Result = await session.execute(stmt_user_by_email, {"email": email})
     return result.scalar_one_or_none()
 
 
 async def create_user(session: AsyncSession, user_data: UserCreateSchemas) -> User:
     logger.info(
-        "Start create user by name %s with email %s"
-        % (user_data.username, user_data.email)
+        "Start create user by name %s with email %s",
+        user_data.username,
+        user_data.email,
     )
-    result: Optional[User] = await find_user_by_email(
-        session=session, email=user_data.email
+    values: dict = user_data.model_dump(exclude={"password"})
+    if user_data.password is not None:
+        hashed_password: bytes = await create_hash_password(user_data.password)
+        values["hashed_password"] = hashed_password.decode()
+
+    stmt = (
+        insert(User)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
     )
-    if result:
+    result: Result = await session.execute(stmt)
+    new_user: Optional[User] = result.scalar_one_or_none()
+    if new_user is None:
+        await session.rollback()
         raise EmailInUse("The email address is already in use")
 
-    try:
-        new_user: User = User(**user_data.model_dump())
-    except ValueError as exc:
-        raise ErrorInData(exc)
-
-    session.add(new_user)
     await session.commit()
     logger.info(
-        "User by name %s  with email %s created" % (user_data.username, user_data.email)
+        "User by name %s  with email %s created", user_data.username, user_data.email
     )
     return new_user
 
 
 async def get_users(session: AsyncSession) -> list[User]:
     logger.info("Get list users")
-    stmt = select(User).order_by(User.id)
-    result: Result = await session.execute(stmt)
+    result: Result = await session.execute(stmt_users)
     users = result.scalars().all()
     return list(users)
 
 
 async def update_user_db(
     session: AsyncSession,
-    user: User,
+    id_user: int,
     user_update: Union[UserUpdateSchemas, UserUpdatePartialSchemas],
     partial: bool = False,
-) -> User:
+) -> Optional[User]:
     logger.info("Start update user")
+    stmt = (
+        update(User)
+        .where(User.id == id_user)
+        .values(
+            **user_update.model_dump(exclude_unset=partial),
+            version=User.version + 1,
+        )
+        .returning(User, invalidation_notify(User.id))
+    )
     try:
-        for name, value in user_update.model_dump(exclude_unset=partial).items():
-            setattr(user, name, value)
+        result: Result = await session.execute(stmt)
+        user: Optional[User] = result.scalars().one_or_none()
         await session.commit()
     except IntegrityError:
         await session.rollback()
         raise UniqueViolationError(
             "Duplicate key value violates unique constraint users_email_key"
         )
+    principal_cache.invalidate(id_user)
     return user
 
 
+async def update_user_password(
+    session: AsyncSession, user: User, hashed_password: str
+) -> None:
+    logger.info("Rehash password user by id %d", user.id)
+    try:
+        user.hashed_password = hashed_password
+        await session.commit()
+    except SQLAlchemyError as exc:
+        logger.exception("Error in data base %s", exc)
+        await session.rollback()
+
+
 async def delete_user_db(session: AsyncSession, user: User) -> None:
-    logger.info("Delete user by id %d" % user.id)
+    logger.info("Delete user by id %d", user.id)
+    user_id: int = user.id
     await session.delete(user)
+    await publish_invalidation(session=session, user_id=user_id)
     await session.commit()
+    principal_cache.invalidate(user_id)
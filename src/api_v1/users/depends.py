@@ -1,24 +1,28 @@
 from typing import Annotated, Optional
 
 import jwt
-from fastapi import Depends, status, Path
+from fastapi import Depends, Response, status, Path
 from fastapi.exceptions import HTTPException
 from fastapi.security import APIKeyCookie
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.config import COOKIE_NAME
-from src.core.database import get_async_session
-from src.core.jwt_utils import decode_jwt
-from src.api_v1.users.crud import get_user_by_id
+from src.core.config import COOKIE_NAME, setting
+from src.core.database import get_async_session, get_read_session
+from src.core.jwt_utils import decode_jwt, refresh_jwt
+from src.core.principal_cache import Principal, principal_from_claims
+from src.core.revocation import revocation_list
+from src.core.loader import BatchLoader, get_loader
+from src.api_v1.users.crud import get_principal_by_id
 from src.models.user import User
 
 cookie_scheme = APIKeyCookie(name=COOKIE_NAME)
 
 
 async def current_user_authorization(
+    response: Response,
     token: str = Depends(cookie_scheme),
     session: AsyncSession = Depends(get_async_session),
-) -> User:
+) -> Principal:
     if token is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
@@ -31,18 +35,53 @@ async def current_user_authorization(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
         )
 
+    jti: Optional[str] = payload.get("jti")
+    if jti is not None and await revocation_list.is_revoked(session=session, jti=jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
+        )
+
+    principal: Optional[Principal]
+    if setting.auth_jwt.stateless:
+        principal = principal_from_claims(payload)
+        if principal is not None:
+            return principal
+
     id_user: int = int(payload["sub"])
-    user: User = await get_user_by_id(session=session, id_user=id_user)
+    principal = await get_principal_by_id(session=session, id_user=id_user)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
+        )
 
-    return user
+    if setting.auth_jwt.stateless:
+        if payload.get("ver", principal.version) != principal.version:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="User not authorized"
+            )
+        access_token: str = await refresh_jwt(
+            payload, claims={"role": principal.role, "ver": principal.version}
+        )
+        response.set_cookie(
+            key=COOKIE_NAME,
+            value=access_token,
+            httponly=True,
+            samesite="lax",
+            path="/",
+        )
+
+    return principal
 
 
 async def current_superuser_user(
+    response: Response,
     token: str = Depends(cookie_scheme),
     session: AsyncSession = Depends(get_async_session),
-) -> User:
+) -> Principal:
 
-    user: User = await current_user_authorization(token=token, session=session)
+    user: Principal = await current_user_authorization(
+        response=response, token=token, session=session
+    )
 
     if not user.is_superuser:
         raise HTTPException(
@@ -54,13 +93,23 @@ async def current_superuser_user(
 
 async def user_by_id(
     id_user: Annotated[int, Path],
-    session: AsyncSession = Depends(get_async_session),
-    superuser_user: User = Depends(current_superuser_user),
+    loader: BatchLoader = Depends(get_loader),
+    superuser_user: Principal = Depends(current_superuser_user),
 ) -> User:
-    user: Optional[User] = await get_user_by_id(session=session, id_user=id_user)
+    user: Optional[User] = await loader.load(User, id_user)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with id {id_user} not found!",
         )
     return user
+
+
+async def read_user_by_id(
+    id_user: Annotated[int, Path],
+    session: AsyncSession = Depends(get_read_session),
+    superuser_user: Principal = Depends(current_superuser_user),
+) -> User:
+    return await user_by_id(
+        id_user=id_user, loader=BatchLoader(session), superuser_user=superuser_user
+    )
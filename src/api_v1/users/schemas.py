@@ -18,7 +18,7 @@ class UserUpdatePartialSchemas(BaseModel):
 
 
 class UserCreateSchemas(UserBaseSchemas):
-    pass
+    password: Optional[str] = Field(None, min_length=8)
 
 
 class OutUserSchemas(UserBaseSchemas):
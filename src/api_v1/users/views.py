@@ -1,20 +1,38 @@
-from fastapi import APIRouter, Depends, Response, status
+from datetime import datetime, timezone
+from typing import Annotated, Optional
+
+import jwt
+from fastapi import APIRouter, Cookie, Depends, Path, Response, status
 from fastapi.exceptions import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.config import COOKIE_NAME
-from src.core.database import get_async_session
+from src.core.database import get_async_session, get_read_session
+from src.core.rate_limit import RateLimit
 from src.core.exceptions import (
     NotFindUser,
     EmailInUse,
+    ExceptDB,
     ErrorInData,
     UniqueViolationError,
+    PasswordCheckRejected,
+)
+from src.core.hashing import needs_rehash
+from src.core.metrics import metrics
+from src.core.jwt_utils import (
+    create_hash_password,
+    create_jwt,
+    decode_jwt,
+    validate_password,
 )
-from src.core.jwt_utils import create_jwt, validate_password
+from src.core.principal_cache import Principal, ROLE_SUPERUSER, ROLE_USER
+from src.core.revocation import revocation_list
 from src.api_v1.users.crud import (
     get_user_from_db,
+    get_users,
     create_user,
     update_user_db,
+    update_user_password,
     delete_user_db,
 )
 from src.models.user import User
@@ -28,11 +46,18 @@ from src.api_v1.users.schemas import (
     UserUpdatePartialSchemas,
 )
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(
+    prefix="/users",
+    tags=["Users"],
+    dependencies=[Depends(RateLimit("users"))],
+)
 
 
 @router.post(
-    "/login", response_model=AuthUserSchemas, status_code=status.HTTP_202_ACCEPTED
+    "/login",
+    response_model=AuthUserSchemas,
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[Depends(RateLimit("login"))],
 )
 async def user_login(
     response: Response,
@@ -42,15 +67,38 @@ async def user_login(
     try:
         user: User = await get_user_from_db(session=session, email=data_login.email)
     except NotFindUser:
+        metrics.inc("login_failures_total", reason="unknown_user")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"The user with the username: {data_login.email} not found",
         )
 
-    if await validate_password(
-        password=data_login.password, hashed_password=user.hashed_password
-    ):
-        access_token: str = await create_jwt(str(user.id))
+    try:
+        valid: bool = await validate_password(
+            password=data_login.password, hashed_password=user.hashed_password
+        )
+    except PasswordCheckRejected:
+        metrics.inc("login_failures_total", reason="rejected")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+    if valid:
+        if needs_rehash(user.hashed_password):
+            hashed_password: bytes = await create_hash_password(data_login.password)
+            await update_user_password(
+                session=session, user=user, hashed_password=hashed_password.decode()
+            )
+
+        access_token: str = await create_jwt(
+            str(user.id),
+            claims={
+                "role": ROLE_SUPERUSER if user.is_superuser else ROLE_USER,
+                "ver": user.version,
+            },
+        )
 
         response.set_cookie(
             key=COOKIE_NAME,
@@ -61,6 +109,7 @@ async def user_login(
         )
         return AuthUserSchemas(access_token=access_token, token_type="bearer")
     else:
+        metrics.inc("login_failures_total", reason="bad_password")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error password for login: {data_login.email}",
@@ -68,8 +117,33 @@ async def user_login(
 
 
 @router.get("/logout", status_code=status.HTTP_200_OK)
-def logout(response: Response):
+async def logout(
+    response: Response,
+    token: Optional[str] = Cookie(None, alias=COOKIE_NAME),
+    session: AsyncSession = Depends(get_async_session),
+):
     response.delete_cookie(COOKIE_NAME)
+    if token is None:
+        return
+
+    try:
+        payload: dict = await decode_jwt(token)
+    except jwt.InvalidTokenError:
+        return
+
+    if payload.get("jti") is None:
+        return
+    try:
+        await revocation_list.revoke(
+            session=session,
+            jti=payload["jti"],
+            expires_at=datetime.fromtimestamp(payload["exp"], tz=timezone.utc),
+        )
+    except ExceptDB as exp:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{exp}",
+        )
 
 
 @router.post(
@@ -78,7 +152,7 @@ def logout(response: Response):
 async def user_registration(
     user: UserCreateSchemas,
     session: AsyncSession = Depends(get_async_session),
-    superuser_user: User = Depends(current_superuser_user),
+    superuser_user: Principal = Depends(current_superuser_user),
 ):
     try:
         result: User = await create_user(session=session, user_data=user)
@@ -93,44 +167,66 @@ async def user_registration(
         return result
 
 
+@router.get(
+    "/list", response_model=list[OutUserSchemas], status_code=status.HTTP_200_OK
+)
+async def get_list_users(
+    session: AsyncSession = Depends(get_read_session),
+    superuser_user: Principal = Depends(current_superuser_user),
+):
+    return await get_users(session=session)
+
+
 @router.put(
     "/{id_user}/", response_model=OutUserSchemas, status_code=status.HTTP_200_OK
 )
 async def update_user(
+    id_user: Annotated[int, Path],
     user_update: UserUpdateSchemas,
-    user: User = Depends(user_by_id),
     session: AsyncSession = Depends(get_async_session),
+    superuser_user: Principal = Depends(current_superuser_user),
 ):
     try:
-        res = await update_user_db(session=session, user=user, user_update=user_update)
+        res = await update_user_db(
+            session=session, id_user=id_user, user_update=user_update
+        )
     except UniqueViolationError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Duplicate email",
         )
-    else:
-        return res
+    if res is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {id_user} not found!",
+        )
+    return res
 
 
 @router.patch(
     "/{id_user}/", response_model=OutUserSchemas, status_code=status.HTTP_200_OK
 )
 async def update_user_partial(
+    id_user: Annotated[int, Path],
     user_update: UserUpdatePartialSchemas,
-    user: User = Depends(user_by_id),
     session: AsyncSession = Depends(get_async_session),
+    superuser_user: Principal = Depends(current_superuser_user),
 ):
     try:
         res = await update_user_db(
-            session=session, user=user, user_update=user_update, partial=True
+            session=session, id_user=id_user, user_update=user_update, partial=True
         )
     except UniqueViolationError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Duplicate email",
         )
-    else:
-        return res
+    if res is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User with id {id_user} not found!",
+        )
+    return res
 
 
 @router.delete("/{id_user}/", status_code=status.HTTP_204_NO_CONTENT)
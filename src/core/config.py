@@ -1,20 +1,14 @@
-import logging
+import tempfile
 from pathlib import Path
+from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 BASE_DIR = Path(__file__).parent.parent.parent
 
 COOKIE_NAME = "bonds_library"
-
-
-def configure_logging(level=logging.INFO):
-    logging.basicConfig(
-        level=level,
-        datefmt="%Y-%m-%d %H:%M:%S",
-        format="[%(asctime)s.%(msecs)03d] %(module)10s:%(lineno)-3d %(levelname)-7s - %(message)s",
-    )
+READ_YOUR_WRITES_COOKIE_NAME = "bonds_library_ryw"
 
 
 class SettingConn(BaseSettings):
@@ -40,16 +34,209 @@ class DbSetting(BaseSettings):
         f"/{setting_conn.postgres_db}"
     )
     echo: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+    replica_urls: list[str] = []
+    read_your_writes_seconds: float = 5.0
+    warmup_connections: int = 2
+    prepared_statement_cache_size: int = 100
 
 
 class AuthJWT(BaseModel):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 15
+    token_cache_size: int = 1024
+    stateless: bool = False
+    stateless_max_age_seconds: int = 60
+
+
+class PasswordHashing(BaseModel):
+    executor: Literal["thread", "process"] = "thread"
+    max_workers: int = 2
+    max_pending: int = 32
+    rounds: int = Field(default=12, ge=4, le=31)
+    max_concurrent_checks: int = 16
+
+
+class PrincipalCacheSetting(BaseModel):
+    ttl_seconds: float = 30.0
+    maxsize: int = 4096
+    channel: str = "principal_invalidate"
+
+
+class RevocationSetting(BaseModel):
+    capacity: int = 100_000
+    error_rate: float = 0.001
+    refresh_seconds: float = 5.0
+
+
+class RateLimitRule(BaseModel):
+    rate: float
+    burst: int
+
+
+SHM_DIR = Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+
+
+class RateLimitSetting(BaseModel):
+    enabled: bool = True
+    path: str = str(SHM_DIR / "managementlibrary_rate_limit")
+    slots: int = 65536
+    groups: dict[str, RateLimitRule] = {
+        "login": RateLimitRule(rate=0.5, burst=10),
+        "users": RateLimitRule(rate=10, burst=30),
+        "books": RateLimitRule(rate=20, burst=60),
+        "library": RateLimitRule(rate=10, burst=30),
+    }
+
+
+class DeadlineRule(BaseModel):
+    timeout_seconds: float
+    statement_timeout_ms: int
+    lock_timeout_ms: int
+
+
+class DeadlineSetting(BaseModel):
+    enabled: bool = True
+    default: DeadlineRule = DeadlineRule(
+        timeout_seconds=10.0, statement_timeout_ms=5000, lock_timeout_ms=2000
+    )
+    # префикс пути -> правило (выбирается самый длинный совпавший префикс)
+    routes: dict[str, DeadlineRule] = {
+        "/api/books/list": DeadlineRule(
+            timeout_seconds=5.0, statement_timeout_ms=3000, lock_timeout_ms=1000
+        ),
+        "/api/library/": DeadlineRule(
+            timeout_seconds=5.0, statement_timeout_ms=3000, lock_timeout_ms=1000
+        ),
+        "/api/books/fuzzy": DeadlineRule(
+            timeout_seconds=2.0, statement_timeout_ms=1000, lock_timeout_ms=500
+        ),
+        "/api/books/import": DeadlineRule(
+            timeout_seconds=1800.0, statement_timeout_ms=300_000, lock_timeout_ms=5000
+        ),
+    }
+    retry_after_seconds: int = 1
+
+
+Priority = Literal["critical", "normal", "low"]
+
+
+class SheddingRule(BaseModel):
+    max_in_flight: int
+    max_pool_waiting: int
+    max_pool_wait_seconds: float
+
+
+class LoadSheddingSetting(BaseModel):
+    enabled: bool = True
+    default_priority: Priority = "normal"
+    # префикс пути -> приоритет (выбирается самый длинный совпавший префикс)
+    priorities: dict[str, Priority] = {
+        "/api/books/list": "low",
+        "/api/books/fuzzy": "low",
+        "/api/library/borrow": "critical",
+        "/api/library/return": "critical",
+    }
+    # для critical правила нет - такие запросы не отбрасываются
+    rules: dict[str, SheddingRule] = {
+        "low": SheddingRule(
+            max_in_flight=50, max_pool_waiting=2, max_pool_wait_seconds=0.1
+        ),
+        "normal": SheddingRule(
+            max_in_flight=200, max_pool_waiting=10, max_pool_wait_seconds=1.0
+        ),
+    }
+    # время ожидания пула учитывается, если соединение выдавалось недавно
+    pool_wait_window_seconds: float = 1.0
+    retry_after_seconds: int = 1
+
+
+class SqlStatsSetting(BaseModel):
+    enabled: bool = True
+    slow_query_seconds: float = 0.2
+    # сколько одинаковых запросов за один HTTP-запрос считается N+1
+    n_plus_one_threshold: int = 5
+    max_statement_length: int = 1000
+    response_headers: bool = True
+
+
+class MetricsSetting(BaseModel):
+    enabled: bool = True
+    # общий каталог воркеров gunicorn: каждый воркер пишет туда свой снимок
+    path: str = str(SHM_DIR / "managementlibrary_metrics")
+    flush_seconds: float = 5.0
+    buckets: list[float] = [
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+    ]
+
+
+class LoggingSetting(BaseModel):
+    level: str = "INFO"
+    format: Literal["json", "text"] = "json"
+    queue_size: int = 10_000
+    # логгер (и его потомки) -> доля пропускаемых сообщений уровня INFO и ниже
+    sampling: dict[str, float] = {
+        "src.api_v1.books.crud": 0.1,
+    }
+
+
+class ProfilingSetting(BaseModel):
+    enabled: bool = True
+    # заголовок, включающий профилирование запроса (только для superuser)
+    header: str = "x-profile"
+    # доля случайно профилируемых запросов
+    sample_rate: float = Field(default=0.0, ge=0.0, le=1.0)
+    interval_seconds: float = 0.005
+    path: str = str(Path(tempfile.gettempdir()) / "managementlibrary_profiles")
+    max_profiles: int = 100
+
+
+class PaginationSetting(BaseModel):
+    # размер страницы, если передан только курсор
+    default_limit: int = 100
+    max_limit: int = 1000
+
+
+class FuzzySearchSetting(BaseModel):
+    # порог word_similarity (pg_trgm.word_similarity_threshold), не ниже
+    # минимального порога запроса /fuzzy
+    threshold: float = Field(default=0.5, ge=0.3, le=1.0)
+    min_query_length: int = 3
+    default_limit: int = 10
+    max_limit: int = 50
+
+
+class BookImportSetting(BaseModel):
+    # строк в одной пачке COPY + слияния
+    chunk_size: int = Field(default=10_000, ge=1)
+    # ошибок в отчете (остальные только считаются)
+    max_errors: int = 1000
+    # размер блока при чтении файла (CLI)
+    read_size: int = 1 << 16
 
 
 class Setting(BaseSettings):
     db: DbSetting = DbSetting()
     auth_jwt: AuthJWT = AuthJWT()
+    password_hashing: PasswordHashing = PasswordHashing()
+    principal_cache: PrincipalCacheSetting = PrincipalCacheSetting()
+    revocation: RevocationSetting = RevocationSetting()
+    rate_limit: RateLimitSetting = RateLimitSetting()
+    deadline: DeadlineSetting = DeadlineSetting()
+    load_shedding: LoadSheddingSetting = LoadSheddingSetting()
+    sql_stats: SqlStatsSetting = SqlStatsSetting()
+    metrics: MetricsSetting = MetricsSetting()
+    logging: LoggingSetting = LoggingSetting()
+    profiling: ProfilingSetting = ProfilingSetting()
+    pagination: PaginationSetting = PaginationSetting()
+    fuzzy_search: FuzzySearchSetting = FuzzySearchSetting()
+    book_import: BookImportSetting = BookImportSetting()
+
+    model_config = SettingsConfigDict(env_nested_delimiter="__")
 
 
 setting = Setting()
@@ -1,16 +1,105 @@
-from typing import AsyncGenerator
+import itertools
+import logging
+import time
+from typing import AsyncGenerator, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 
-from src.core.config import setting
+from src.core.config import READ_YOUR_WRITES_COOKIE_NAME, setting
+from src.core.pool_stats import instrumented_pool_class
 
-engine = create_async_engine(
-    url=setting.db.url,
-    echo=setting.db.echo,
-)
+logger = logging.getLogger(__name__)
+
+
+def _create_engine(url: str, name: str) -> AsyncEngine:
+    return create_async_engine(
+        url=url,
+        echo=setting.db.echo,
+        poolclass=instrumented_pool_class(name),
+        pool_size=setting.db.pool_size,
+        max_overflow=setting.db.max_overflow,
+        pool_timeout=setting.db.pool_timeout,
+        pool_recycle=setting.db.pool_recycle,
+        pool_pre_ping=setting.db.pool_pre_ping,
+        connect_args={
+            "prepared_statement_cache_size": setting.db.prepared_statement_cache_size
+        },
+    )
+
+
+engine = _create_engine(setting.db.url, "primary")
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+replica_engines: list[AsyncEngine] = [
+    _create_engine(url, f"replica-{num}")
+    for num, url in enumerate(setting.db.replica_urls)
+]
+replica_session_makers: list[async_sessionmaker] = [
+    async_sessionmaker(replica, expire_on_commit=False) for replica in replica_engines
+]
+_replica_order = itertools.cycle(range(len(replica_session_makers)))
+
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+def read_your_writes_active(request: Request) -> bool:
+    """
+    Проверяет, изменял ли клиент данные в течение окна read_your_writes_seconds
+    (в этом случае чтение выполняется с primary, чтобы клиент увидел свои изменения)
+    :param request: запрос
+    :type request: Request
+    :rtype: bool
+    """
+    value: Optional[str] = request.cookies.get(READ_YOUR_WRITES_COOKIE_NAME)
+    if value is None:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+async def _open_replica_session() -> Optional[AsyncSession]:
+    for _ in range(len(replica_session_makers)):
+        session: AsyncSession = replica_session_makers[next(_replica_order)]()
+        try:
+            await session.execute(text("SET TRANSACTION READ ONLY"))
+        except (OSError, DBAPIError, OperationalError) as exc:
+            logger.warning("Replica is unavailable: %s", exc)
+            await session.close()
+            continue
+        return session
+    return None
+
+
+async def get_read_session(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Сессия для чтения: транзакция только для чтения на одной из реплик
+    (по кругу), при недоступности реплик или в окне read-your-writes - primary
+    """
+    if not replica_session_makers or read_your_writes_active(request):
+        yield session
+        return
+
+    replica: Optional[AsyncSession] = await _open_replica_session()
+    if replica is None:
+        yield session
+        return
+    try:
+        yield replica
+    finally:
+        await replica.close()
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import DeadlineRule, setting
+from src.core.routing import longest_prefix_match
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE: query_canceled (statement_timeout), lock_not_available (lock_timeout)
+DB_TIMEOUT_SQLSTATES: dict[str, str] = {
+    "57014": "statement",
+    "55P03": "lock",
+}
+
+
+@dataclass
+class Deadline:
+    rule: DeadlineRule
+    expires_at: float
+    db_timeout: Optional[str] = None
+
+    def remaining_ms(self) -> int:
+        return max(1, int((self.expires_at - time.monotonic()) * 1000))
+
+
+@dataclass
+class DeadlineStats:
+    deadline_exceeded: int = 0
+    statement_timeouts: int = 0
+    lock_timeouts: int = 0
+
+
+deadline_stats = DeadlineStats()
+
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def rule_for_path(path: str) -> DeadlineRule:
+    """
+    Возвращает правило для пути запроса (самый длинный совпавший префикс)
+    :param path: путь запроса
+    :type path: str
+    :rtype: DeadlineRule
+    """
+    rule: Optional[DeadlineRule] = longest_prefix_match(path, setting.deadline.routes)
+    return setting.deadline.default if rule is None else rule
+
+
+@event.listens_for(Session, "after_begin")
+def _set_local_timeouts(session, transaction, connection):
+    deadline: Optional[Deadline] = current_deadline.get()
+    if deadline is None:
+        return
+    remaining: int = deadline.remaining_ms()
+    connection.execute(
+        text(
+            "SELECT set_config('statement_timeout', :statement_timeout, true), "
+            "set_config('lock_timeout', :lock_timeout, true)"
+        ),
+        {
+            "statement_timeout": str(min(deadline.rule.statement_timeout_ms, remaining)),
+            "lock_timeout": str(min(deadline.rule.lock_timeout_ms, remaining)),
+        },
+    )
+
+
+@event.listens_for(Engine, "handle_error")
+def _record_db_timeout(context):
+    sqlstate: Optional[str] = getattr(context.original_exception, "sqlstate", None)
+    kind: Optional[str] = DB_TIMEOUT_SQLSTATES.get(sqlstate)
+    if kind is None:
+        return
+    if kind == "statement":
+        deadline_stats.statement_timeouts += 1
+    else:
+        deadline_stats.lock_timeouts += 1
+    deadline: Optional[Deadline] = current_deadline.get()
+    if deadline is not None:
+        deadline.db_timeout = kind
+
+
+async def _send_error(send: Send, status_code: int, detail: str) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(setting.deadline.retry_after_seconds).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": orjson.dumps({"detail": detail})})
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware: ограничивает время обработки запроса (504 и отмена
+    обработчика по истечении срока). В транзакциях запроса устанавливаются
+    statement_timeout/lock_timeout, их срабатывание превращается в ответ 503
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not setting.deadline.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        rule: DeadlineRule = rule_for_path(scope["path"])
+        deadline = Deadline(rule=rule, expires_at=time.monotonic() + rule.timeout_seconds)
+        token = current_deadline.set(deadline)
+        started = False
+        replaced = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal started, replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+                if deadline.db_timeout is not None:
+                    replaced = True
+                    logger.warning(
+                        "Database %s timeout on %s", deadline.db_timeout, scope["path"]
+                    )
+                    await _send_error(send, 503, "Database timeout")
+                    return
+            await send(message)
+
+        try:
+            async with asyncio.timeout(rule.timeout_seconds):
+                await self.app(scope, receive, send_wrapper)
+        except TimeoutError:
+            deadline_stats.deadline_exceeded += 1
+            logger.warning("Deadline exceeded on %s", scope["path"])
+            if not started:
+                await _send_error(send, 504, "Request deadline exceeded")
+        except Exception:
+            if deadline.db_timeout is None or started:
+                raise
+            logger.warning("Database %s timeout on %s", deadline.db_timeout, scope["path"])
+            await _send_error(send, 503, "Database timeout")
+        finally:
+            current_deadline.reset(token)
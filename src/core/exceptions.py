@@ -16,3 +16,11 @@ class EmailInUse(Exception):
 
 class UniqueViolationError(Exception):
     pass
+
+
+class PasswordCheckRejected(Exception):
+    pass
+
+
+class InvalidCursor(Exception):
+    pass
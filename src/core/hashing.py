@@ -0,0 +1,113 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from src.core.config import setting
+from src.core.exceptions import PasswordCheckRejected
+
+T = TypeVar("T")
+
+_executor: Optional[Executor] = None
+_pending: Optional[asyncio.Semaphore] = None
+_checks_in_flight: int = 0
+
+
+def get_password_executor() -> Executor:
+    """
+    Возвращает пул для вычисления хешей паролей (создается при первом обращении,
+    чтобы каждый воркер gunicorn получил собственный пул после fork)
+    :rtype: Executor
+    :return: пул потоков или процессов
+    """
+    global _executor
+    if _executor is None:
+        conf = setting.password_hashing
+        if conf.executor == "process":
+            _executor = ProcessPoolExecutor(max_workers=conf.max_workers)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=conf.max_workers,
+                thread_name_prefix="password",
+            )
+    return _executor
+
+
+def _get_pending_semaphore() -> asyncio.Semaphore:
+    global _pending
+    if _pending is None:
+        conf = setting.password_hashing
+        _pending = asyncio.Semaphore(conf.max_workers + conf.max_pending)
+    return _pending
+
+
+async def run_password_job(func: Callable[..., T], *args: Any) -> T:
+    """
+    Выполняет функцию хеширования/проверки пароля в пуле, не блокируя event loop.
+    Количество заданий, переданных в пул, ограничено max_workers + max_pending,
+    остальные ожидают своей очереди на семафоре
+    :param func: функция (bcrypt.hashpw, bcrypt.checkpw)
+    :type func: Callable
+    :param args: аргументы функции
+    :rtype: T
+    :return: результат выполнения функции
+    """
+    async with _get_pending_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_password_executor(), func, *args)
+
+
+async def run_admitted_password_job(func: Callable[..., T], *args: Any) -> T:
+    """
+    Как run_password_job, но с контролем допуска: если одновременно выполняется
+    max_concurrent_checks проверок, новая проверка сразу отклоняется
+    :param func: функция (bcrypt.checkpw)
+    :type func: Callable
+    :param args: аргументы функции
+    :rtype: T
+    :return: результат выполнения функции
+    :raises PasswordCheckRejected: превышен лимит одновременных проверок
+    """
+    global _checks_in_flight
+    if _checks_in_flight >= setting.password_hashing.max_concurrent_checks:
+        raise PasswordCheckRejected("Too many concurrent password checks")
+    _checks_in_flight += 1
+    try:
+        return await run_password_job(func, *args)
+    finally:
+        _checks_in_flight -= 1
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """
+    Возвращает стоимость (cost) bcrypt-хеша вида $2b$12$...
+    :param hashed_password: хеш-значение пароля
+    :type hashed_password: str
+    :rtype: Optional[int]
+    :return: cost или None, если формат хеша не распознан
+    """
+    parts = hashed_password.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Проверяет, отличается ли cost хеша от настроенного
+    :param hashed_password: хеш-значение пароля
+    :type hashed_password: str
+    :rtype: bool
+    :return: True, если пароль нужно перехешировать
+    """
+    return hash_rounds(hashed_password) != setting.password_hashing.rounds
+
+
+def shutdown_password_executor() -> None:
+    """
+    Останавливает пул хеширования паролей
+    """
+    global _executor, _pending
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _pending = None
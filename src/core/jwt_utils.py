@@ -1,11 +1,14 @@
 from datetime import datetime, timedelta, timezone
 import asyncio
+import uuid
 from typing import Optional
 
 import bcrypt
 import jwt
 
 from src.core.config import setting, setting_conn
+from src.core.hashing import run_admitted_password_job, run_password_job
+from src.core.token_cache import token_cache
 
 
 async def create_hash_password(password: str) -> bytes:
@@ -16,10 +19,9 @@ async def create_hash_password(password: str) -> bytes:
     :rtype: bytes
     :return: хеш значение пароля
     """
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=setting.password_hashing.rounds)
     pwd_bytes: bytes = password.encode()
-    await asyncio.sleep(0)
-    return bcrypt.hashpw(pwd_bytes, salt)
+    return await run_password_job(bcrypt.hashpw, pwd_bytes, salt)
 
 
 async def validate_password(
@@ -34,11 +36,12 @@ async def validate_password(
     :type hashed_password: str
     :rtype: bool
     :return: возвращает True, если пароль верный иначе - False
+    :raises PasswordCheckRejected: превышен лимит одновременных проверок
     """
-    await asyncio.sleep(0)
-    return bcrypt.checkpw(
-        password=password.encode(),
-        hashed_password=hashed_password.encode(),
+    return await run_admitted_password_job(
+        bcrypt.checkpw,
+        password.encode(),
+        hashed_password.encode(),
     )
 
 
@@ -70,7 +73,7 @@ async def decode_jwt(
     algorithm: str = setting.auth_jwt.algorithm,
 ):
     """
-    Раскодирует jwt-токен
+    Раскодирует jwt-токен. Проверенные токены кешируются до истечения их срока действия
     :param token: jwt-токен
     :type token: str | bytes
     :param key: секретный ключ шифрования
@@ -80,7 +83,13 @@ async def decode_jwt(
     :rtype: dict
     :return: содержание токена (payload)
     """
+    digest: str = token_cache.digest(token, key, algorithm)
+    cached: Optional[dict] = token_cache.get(digest)
+    if cached is not None:
+        return cached
+
     decoded = jwt.decode(token, key, algorithms=[algorithm])
+    token_cache.put(digest, decoded)
     await asyncio.sleep(0)
     return decoded
 
@@ -88,6 +97,7 @@ async def decode_jwt(
 async def create_jwt(
     user_id: str,
     expire_minutes: Optional[int] = None,
+    claims: Optional[dict] = None,
 ) -> str:
     """
     Создание jwt-токен
@@ -95,13 +105,35 @@ async def create_jwt(
     :type user_id: str
     :param expire_minutes: время экспирации токена
     :type expire_minutes: Optional[int]
+    :param claims: дополнительные claims (роль и версия пользователя)
+    :type claims: Optional[dict]
     :rtype: str
     :return: jwt-токен
     """
     payload = dict()
+    if claims:
+        payload.update(claims)
     payload["sub"] = user_id
+    payload["jti"] = uuid.uuid4().hex
     if expire_minutes is None:
         expire_minutes = setting.auth_jwt.access_token_expire_minutes
-    expire = datetime.now(timezone.utc) + timedelta(minutes=expire_minutes)
-    payload["exp"] = expire
+    now = datetime.now(timezone.utc)
+    payload["iat"] = now
+    payload["exp"] = now + timedelta(minutes=expire_minutes)
     return await encode_jwt(payload)
+
+
+async def refresh_jwt(payload: dict, claims: dict) -> str:
+    """
+    Переподписывает токен с актуальными claims, сохраняя срок его действия
+    :param payload: содержание текущего токена
+    :type payload: dict
+    :param claims: актуальные claims (роль и версия пользователя)
+    :type claims: dict
+    :rtype: str
+    :return: jwt-токен
+    """
+    new_payload = dict(payload)
+    new_payload.update(claims)
+    new_payload["iat"] = datetime.now(timezone.utc)
+    return await encode_jwt(new_payload)
@@ -0,0 +1,127 @@
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional
+
+import orjson
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import Priority, SheddingRule, setting
+from src.core.pool_stats import pool_stats
+from src.core.routing import longest_prefix_match
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadStats:
+    in_flight: int = 0
+    shed: Counter[str] = field(default_factory=Counter)
+
+
+load_stats = LoadStats()
+
+
+def priority_for_path(path: str) -> Priority:
+    """
+    Возвращает приоритет запроса (самый длинный совпавший префикс пути)
+    :param path: путь запроса
+    :type path: str
+    :rtype: Priority
+    """
+    priority: Optional[Priority] = longest_prefix_match(
+        path, setting.load_shedding.priorities
+    )
+    return setting.load_shedding.default_priority if priority is None else priority
+
+
+def pool_pressure() -> tuple[int, float]:
+    """
+    Состояние пулов соединений воркера
+    :rtype: tuple[int, float]
+    :return: число ожидающих соединения и сглаженное время ожидания
+    (учитываются только пулы, выдававшие соединение в последние
+    pool_wait_window_seconds)
+    """
+    now: float = time.monotonic()
+    window: float = setting.load_shedding.pool_wait_window_seconds
+    waiting: int = sum(stats.waiting for stats in pool_stats.values())
+    wait: float = max(
+        (
+            stats.wait_seconds_ewma
+            for stats in pool_stats.values()
+            if now - stats.last_checkout <= window
+        ),
+        default=0.0,
+    )
+    return waiting, wait
+
+
+def should_shed(priority: Priority) -> Optional[str]:
+    """
+    Проверяет, нужно ли отбросить запрос с данным приоритетом
+    :param priority: приоритет запроса
+    :type priority: Priority
+    :rtype: Optional[str]
+    :return: причина или None, если запрос принимается
+    """
+    rule: Optional[SheddingRule] = setting.load_shedding.rules.get(priority)
+    if rule is None:
+        return None
+    if load_stats.in_flight >= rule.max_in_flight:
+        return "in_flight"
+    waiting, wait = pool_pressure()
+    if waiting > rule.max_pool_waiting:
+        return "pool_waiting"
+    if wait > rule.max_pool_wait_seconds:
+        return "pool_wait"
+    return None
+
+
+class LoadSheddingMiddleware:
+    """
+    ASGI middleware: при перегрузке (много запросов в обработке, очередь
+    к пулу соединений) сразу отвечает 503 на запросы низкого приоритета,
+    не допуская их до ожидания соединения
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not setting.load_shedding.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        priority: Priority = priority_for_path(scope["path"])
+        reason: Optional[str] = should_shed(priority)
+        if reason is not None:
+            load_stats.shed[priority] += 1
+            logger.warning("Shed %s request %s: %s", priority, scope["path"], reason)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (
+                            b"retry-after",
+                            str(setting.load_shedding.retry_after_seconds).encode(),
+                        ),
+                    ],
+                }
+            )
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": orjson.dumps({"detail": "Service overloaded"}),
+                }
+            )
+            return
+
+        load_stats.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            load_stats.in_flight -= 1
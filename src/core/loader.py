@@ -0,0 +1,108 @@
+from collections import defaultdict
+from typing import Optional, Sequence, TypeVar
+
+from fastapi import Depends
+from sqlalchemy import literal, select
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.util import identity_key
+
+from src.core.database import get_async_session
+from src.models.base import Base
+
+ModelT = TypeVar("ModelT", bound=Base)
+
+
+class BatchLoader:
+    """
+    Загрузчик объектов по первичному ключу в рамках одного запроса.
+    Ключи накапливаются (prime) и загружаются одним dispatch: одиночные ключи
+    разных моделей - одним запросом через LEFT JOIN, несколько ключей одной
+    модели - через IN. Объекты, уже находящиеся в identity map сессии,
+    повторно не запрашиваются. queries - число выполненных загрузчиком запросов
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.queries = 0
+        self._pending: dict[type[Base], set[int]] = defaultdict(set)
+        self._loaded: dict[tuple[type[Base], int], Optional[Base]] = dict()
+
+    def _cached(self, model: type[Base], pk: int) -> Optional[Base]:
+        return self.session.identity_map.get(identity_key(model, pk))
+
+    def prime(self, model: type[Base], *pks: int) -> None:
+        for pk in pks:
+            if (model, pk) in self._loaded:
+                continue
+            obj = self._cached(model, pk)
+            if obj is not None:
+                self._loaded[(model, pk)] = obj
+            else:
+                self._pending[model].add(pk)
+
+    async def _load_single(self, keys: list[tuple[type[Base], int]]) -> None:
+        anchor = select(literal(1).label("anchor")).subquery()
+        entities = [aliased(model) for model, _ in keys]
+        stmt = select(*entities).select_from(anchor)
+        for entity, (_, pk) in zip(entities, keys):
+            stmt = stmt.outerjoin(entity, entity.id == pk)
+        result: Result = await self.session.execute(stmt)
+        self.queries += 1
+        row = result.one()
+        for key, obj in zip(keys, row):
+            self._loaded[key] = obj
+
+    async def _load_many(self, model: type[Base], pks: set[int]) -> None:
+        result: Result = await self.session.execute(
+            select(model).where(model.id.in_(sorted(pks)))
+        )
+        self.queries += 1
+        found = {obj.id: obj for obj in result.scalars().all()}
+        for pk in pks:
+            self._loaded[(model, pk)] = found.get(pk)
+
+    async def dispatch(self) -> None:
+        """
+        Загружает все накопленные ключи
+        """
+        pending, self._pending = self._pending, defaultdict(set)
+        single: list[tuple[type[Base], int]] = []
+        for model, pks in pending.items():
+            if len(pks) == 1:
+                single.append((model, next(iter(pks))))
+            elif pks:
+                await self._load_many(model, pks)
+        if single:
+            await self._load_single(single)
+
+    async def load(self, model: type[ModelT], pk: int) -> Optional[ModelT]:
+        """
+        Возвращает объект по первичному ключу (вместе с ним загружаются и все
+        ранее накопленные ключи)
+        :param model: модель
+        :type model: type[Base]
+        :param pk: первичный ключ
+        :type pk: int
+        :rtype: Optional[Base]
+        :return: объект или None, если не найден
+        """
+        self.prime(model, pk)
+        if self._pending:
+            await self.dispatch()
+        return self._loaded.get((model, pk))
+
+    async def load_many(
+        self, model: type[ModelT], pks: Sequence[int]
+    ) -> list[Optional[ModelT]]:
+        self.prime(model, *pks)
+        if self._pending:
+            await self.dispatch()
+        return [self._loaded.get((model, pk)) for pk in pks]
+
+
+async def get_loader(
+    session: AsyncSession = Depends(get_async_session),
+) -> BatchLoader:
+    return BatchLoader(session)
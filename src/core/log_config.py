@@ -0,0 +1,202 @@
+import atexit
+import copy
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import setting
+
+TEXT_FORMAT = (
+    "[%(asctime)s.%(msecs)03d] %(module)10s:%(lineno)-3d %(levelname)-7s "
+    "[%(request_id)s] - %(message)s"
+)
+TEXT_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+REQUEST_ID_HEADER = b"x-request-id"
+_REQUEST_ID = re.compile(r"^[\w.-]{1,64}$")
+
+# аргументы этих типов безопасно форматировать позже, в потоке записи
+LAZY_ARG_TYPES = (str, int, float, bool, type(None))
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Добавляет в запись идентификатор текущего HTTP-запроса
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускает только долю rate сообщений уровня INFO и ниже от логгера
+    (настройка наследуется потомками логгера), WARNING и выше - всегда
+    """
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+        self._cache: dict[str, Optional[float]] = dict()
+
+    def _rate(self, name: str) -> Optional[float]:
+        if name not in self._cache:
+            rate: Optional[float] = None
+            parts: list[str] = name.split(".")
+            for size in range(len(parts), 0, -1):
+                rate = self.rates.get(".".join(parts[:size]))
+                if rate is not None:
+                    break
+            self._cache[name] = rate
+        return self._cache[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate: Optional[float] = self._rate(record.name)
+        return rate is None or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Запись в одну строку JSON
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "line": record.lineno,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return orjson.dumps(data, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Передает записи в очередь потока записи. Сообщение не форматируется
+    в event loop, если аргументы - простые значения; при переполнении
+    очереди запись отбрасывается
+    """
+
+    dropped: int = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.args and not (
+            isinstance(record.args, tuple)
+            and all(isinstance(arg, LAZY_ARG_TYPES) for arg in record.args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging() -> None:
+    """
+    Настраивает корневой логгер: записи через очередь передаются потоку,
+    который пишет их в stderr (JSON или текст). Повторный вызов ничего не делает
+    """
+    global _listener
+    if _listener is not None:
+        return
+    conf = setting.logging
+
+    stream = logging.StreamHandler(sys.stderr)
+    if conf.format == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=TEXT_DATEFMT))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=conf.queue_size))
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(SamplingFilter(conf.sampling))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(conf.level)
+
+    _listener = QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Дописывает оставшиеся в очереди записи и останавливает поток записи
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware: идентификатор запроса (из заголовка X-Request-ID или
+    новый) для записей лога, возвращается в заголовке ответа
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id: Optional[str] = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if request_id is None or not _REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (REQUEST_ID_HEADER, request_id.encode()),
+                ]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,233 @@
+import logging
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from pathlib import Path
+from typing import Optional
+
+import orjson
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import setting
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# имя -> (тип, описание)
+METRICS: dict[str, tuple[str, str]] = {
+    "http_requests_total": ("counter", "HTTP requests by route and status code"),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by route"),
+    "library_borrows_total": ("counter", "Books borrowed"),
+    "library_returns_total": ("counter", "Books returned"),
+    "login_failures_total": ("counter", "Failed login attempts by reason"),
+}
+
+LabelsKey = tuple[tuple[str, str], ...]
+MetricKey = tuple[str, LabelsKey]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: LabelsKey) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Счетчики и гистограммы воркера. Снимок периодически (не чаще flush_seconds)
+    записывается в файл <pid>.json общего каталога, при выдаче /metrics
+    снимки всех воркеров суммируются
+    """
+
+    def __init__(self, directory: str, buckets: list[float], flush_seconds: float) -> None:
+        self.directory = Path(directory)
+        self.buckets = sorted(buckets)
+        self.flush_seconds = flush_seconds
+        self._counters: dict[MetricKey, float] = defaultdict(float)
+        # счетчики по корзинам (последняя - +Inf), сумма, количество
+        self._histograms: dict[MetricKey, list[float]] = dict()
+        self._last_flush = 0.0
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, str]) -> MetricKey:
+        if name not in METRICS:
+            raise ValueError(f"Unknown metric {name}")
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """
+        Увеличивает счетчик
+        :param name: имя метрики
+        :type name: str
+        :param value: приращение
+        :type value: float
+        :param labels: метки
+        """
+        self._counters[self._key(name, labels)] += value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Добавляет наблюдение в гистограмму
+        :param name: имя метрики
+        :type name: str
+        :param value: значение (секунды)
+        :type value: float
+        :param labels: метки
+        """
+        key: MetricKey = self._key(name, labels)
+        histogram: Optional[list[float]] = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = [0] * (len(self.buckets) + 3)
+        histogram[bisect_left(self.buckets, value)] += 1
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def _path(self) -> Path:
+        return self.directory / f"{os.getpid()}.json"
+
+    def flush(self, force: bool = False) -> None:
+        """
+        Записывает снимок воркера в общий каталог
+        :param force: записать независимо от flush_seconds
+        :type force: bool
+        """
+        now: float = time.monotonic()
+        if not force and now - self._last_flush < self.flush_seconds:
+            return
+        self._last_flush = now
+        data = {
+            "counters": [
+                [name, labels, value] for (name, labels), value in self._counters.items()
+            ],
+            "histograms": [
+                [name, labels, values]
+                for (name, labels), values in self._histograms.items()
+            ],
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path: Path = self._path()
+            tmp: Path = path.with_suffix(".tmp")
+            tmp.write_bytes(orjson.dumps(data))
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("Failed to write metrics snapshot: %s", exc)
+
+    def collect(self) -> tuple[dict[MetricKey, float], dict[MetricKey, list[float]]]:
+        """
+        Суммирует снимки всех воркеров
+        :rtype: tuple[dict, dict]
+        :return: счетчики и гистограммы
+        """
+        self.flush(force=True)
+        counters: dict[MetricKey, float] = defaultdict(float)
+        histograms: dict[MetricKey, list[float]] = dict()
+        for path in self.directory.glob("*.json"):
+            try:
+                data: dict = orjson.loads(path.read_bytes())
+            except (OSError, orjson.JSONDecodeError) as exc:
+                logger.warning("Skip metrics snapshot %s: %s", path.name, exc)
+                continue
+            for name, labels, value in data["counters"]:
+                counters[(name, tuple(map(tuple, labels)))] += value
+            for name, labels, values in data["histograms"]:
+                key: MetricKey = (name, tuple(map(tuple, labels)))
+                if len(values) != len(self.buckets) + 3:
+                    continue
+                total: Optional[list[float]] = histograms.get(key)
+                if total is None:
+                    histograms[key] = list(values)
+                else:
+                    histograms[key] = [a + b for a, b in zip(total, values)]
+        return counters, histograms
+
+    def render(self) -> str:
+        """
+        Метрики всех воркеров в текстовом формате Prometheus
+        :rtype: str
+        """
+        counters, histograms = self.collect()
+        lines: list[str] = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip([*self.buckets, None], values):
+                    cumulative += count
+                    le: str = "+Inf" if bound is None else _format_value(bound)
+                    lines.append(
+                        f"{name}_bucket{_format_labels((*labels, ('le', le)))} "
+                        f"{_format_value(cumulative)}"
+                    )
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+                lines.append(
+                    f"{name}_count{_format_labels(labels)} {_format_value(values[-1])}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry(
+    directory=setting.metrics.path,
+    buckets=setting.metrics.buckets,
+    flush_seconds=setting.metrics.flush_seconds,
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: число запросов, коды ответов и время обработки
+    по шаблону маршрута (например /api/books/{book_id}/)
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not setting.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start: float = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route: str = getattr(scope.get("route"), "path", "<unmatched>")
+            metrics.inc(
+                "http_requests_total",
+                method=scope["method"],
+                route=route,
+                status=str(status_code),
+            )
+            metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route,
+            )
+            metrics.flush()
@@ -0,0 +1,116 @@
+import base64
+import binascii
+from typing import Any, Optional, Union
+
+import orjson
+from sqlalchemy import ColumnElement, and_, or_, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+from src.core.exceptions import InvalidCursor
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    """
+    Курсор следующей страницы (base64url от JSON, для клиента непрозрачен)
+    :param sort: ключ сортировки, для которого выдан курсор
+    :type sort: str
+    :param value: значение ключа сортировки в последней строке страницы
+    :param last_id: id последней строки страницы
+    :type last_id: int
+    :rtype: str
+    """
+    data: bytes = orjson.dumps({"s": sort, "v": value, "id": last_id})
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    """
+    Разбирает курсор
+    :param cursor: курсор из параметра next
+    :type cursor: str
+    :param sort: текущий ключ сортировки
+    :type sort: str
+    :rtype: tuple[Any, int]
+    :return: значение ключа сортировки и id последней строки предыдущей страницы
+    :raises InvalidCursor: курсор поврежден или выдан для другой сортировки
+    """
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value, last_id = data["v"], int(data["id"])
+        cursor_sort = data["s"]
+    except (binascii.Error, orjson.JSONDecodeError, KeyError, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    if cursor_sort != sort:
+        raise InvalidCursor("Cursor was issued for another sort order")
+    return value, last_id
+
+
+def keyset_condition(
+    column: Union[InstrumentedAttribute, ColumnElement],
+    id_column: InstrumentedAttribute,
+    descending: bool,
+    value: Any,
+    last_id: int,
+) -> ColumnElement[bool]:
+    """
+    Условие "строка после (value, last_id)" для сортировки
+    ORDER BY column [DESC] NULLS LAST, id [DESC]
+    :param column: колонка (или выражение) сортировки
+    :param id_column: первичный ключ (разрешает равные значения column)
+    :param descending: сортировка по убыванию
+    :type descending: bool
+    :param value: значение column в последней строке предыдущей страницы
+    :param last_id: id последней строки предыдущей страницы
+    :type last_id: int
+    :rtype: ColumnElement[bool]
+    """
+    if column is id_column:
+        return id_column < last_id if descending else id_column > last_id
+    if value is None:
+        after_id = id_column < last_id if descending else id_column > last_id
+        return and_(column.is_(None), after_id)
+    key, bound = tuple_(column, id_column), tuple_(value, last_id)
+    condition = key < bound if descending else key > bound
+    if getattr(column, "nullable", False):
+        return or_(condition, column.is_(None))
+    return condition
+
+
+def keyset_order(
+    column: Union[InstrumentedAttribute, ColumnElement],
+    id_column: InstrumentedAttribute,
+    descending: bool,
+) -> list:
+    """
+    Порядок сортировки, согласованный с keyset_condition. Для колонок NOT NULL
+    NULLS LAST не указывается: так обратный порядок совпадает с обратным
+    проходом обычного индекса (column, id)
+    :rtype: list
+    """
+    if column is id_column:
+        return [id_column.desc() if descending else id_column.asc()]
+    order = column.desc() if descending else column.asc()
+    if getattr(column, "nullable", True):
+        order = order.nulls_last()
+    return [order, id_column.desc() if descending else id_column.asc()]
+
+
+def next_cursor(rows: list, limit: Optional[int], sort: str, field: str) -> Optional[str]:
+    """
+    Курсор следующей страницы или None, если страница последняя
+    :param rows: строки страницы (запрошено limit + 1 строк)
+    :type rows: list
+    :param limit: размер страницы
+    :type limit: Optional[int]
+    :param sort: ключ сортировки
+    :type sort: str
+    :param field: имя поля сортировки в строке
+    :type field: str
+    :rtype: Optional[str]
+    """
+    if limit is None or len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(sort, getattr(last, field), last.id)
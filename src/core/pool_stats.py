@@ -0,0 +1,84 @@
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+EWMA_ALPHA = 0.2
+
+
+@dataclass
+class PoolStats:
+    name: str
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    last_wait_seconds: float = 0.0
+    wait_seconds_ewma: float = 0.0
+    last_checkout: float = 0.0
+    waiting: int = 0
+
+    def record(self, wait: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += wait
+        self.last_wait_seconds = wait
+        self.wait_seconds_ewma += EWMA_ALPHA * (wait - self.wait_seconds_ewma)
+        self.last_checkout = time.monotonic()
+        if wait > self.wait_seconds_max:
+            self.wait_seconds_max = wait
+
+
+pool_stats: dict[str, PoolStats] = dict()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, замеряющий время ожидания выдачи соединения
+    """
+
+    stats: PoolStats
+
+    def connect(self):
+        start = time.perf_counter()
+        self.stats.waiting += 1
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.waiting -= 1
+            self.stats.record(time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.stats.name,
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.stats.checkouts,
+            "timeouts": self.stats.timeouts,
+            "waiting": self.stats.waiting,
+            "wait_seconds_total": round(self.stats.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.stats.wait_seconds_max, 6),
+        }
+
+
+def instrumented_pool_class(name: str) -> type[InstrumentedQueuePool]:
+    """
+    Создает класс пула со своим набором статистики (класс, а не экземпляр,
+    передается в create_async_engine и переживает engine.dispose())
+    :param name: имя пула (primary, replica-0, ...)
+    :type name: str
+    :rtype: type[InstrumentedQueuePool]
+    :return: класс пула
+    """
+    stats = pool_stats.setdefault(name, PoolStats(name=name))
+    return type(
+        f"InstrumentedQueuePool_{name}",
+        (InstrumentedQueuePool,),
+        {"stats": stats},
+    )
@@ -0,0 +1,180 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import asyncpg
+from sqlalchemy import String, cast, func, text
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import setting
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_ALL = "*"
+
+ROLE_SUPERUSER = "superuser"
+ROLE_USER = "user"
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: int
+    is_superuser: bool
+    version: int = 1
+
+    @property
+    def role(self) -> str:
+        return ROLE_SUPERUSER if self.is_superuser else ROLE_USER
+
+
+def principal_from_claims(payload: dict) -> Optional[Principal]:
+    """
+    Восстанавливает сведения о пользователе из подписанных claims токена
+    (режим stateless). Claims старше stateless_max_age_seconds не используются,
+    чтобы изменение роли вступало в силу в пределах этого окна
+    :param payload: содержание токена
+    :type payload: dict
+    :rtype: Optional[Principal]
+    :return: Principal или None, если нужно свериться с БД
+    """
+    issued = payload.get("iat")
+    role = payload.get("role")
+    version = payload.get("ver")
+    if issued is None or role is None or version is None:
+        return None
+    if time.time() - issued > setting.auth_jwt.stateless_max_age_seconds:
+        return None
+    return Principal(
+        id=int(payload["sub"]),
+        is_superuser=role == ROLE_SUPERUSER,
+        version=int(version),
+    )
+
+
+class PrincipalCache:
+    """
+    TTL-кеш сведений о пользователях (id, is_superuser) в рамках одного воркера
+    """
+
+    def __init__(self, ttl: float, maxsize: int) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[int, tuple[float, Principal]] = OrderedDict()
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        entry = self._data.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expire, principal = entry
+        if time.monotonic() >= expire:
+            del self._data[user_id]
+            self.misses += 1
+            return None
+        self._data.move_to_end(user_id)
+        self.hits += 1
+        return principal
+
+    def put(self, principal: Principal) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[principal.id] = (time.monotonic() + self.ttl, principal)
+        self._data.move_to_end(principal.id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+principal_cache = PrincipalCache(
+    ttl=setting.principal_cache.ttl_seconds,
+    maxsize=setting.principal_cache.maxsize,
+)
+
+
+async def publish_invalidation(session: AsyncSession, user_id: int) -> None:
+    """
+    Отправляет остальным воркерам уведомление об изменении пользователя
+    (NOTIFY доставляется после фиксации транзакции сессии)
+    :param session: сессия БД
+    :type session: AsyncSession
+    :param user_id: id пользователя
+    :type user_id: int
+    """
+    await session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": setting.principal_cache.channel, "payload": str(user_id)},
+    )
+
+
+def invalidation_notify(user_id: ColumnElement) -> ColumnElement:
+    """
+    Выражение pg_notify для RETURNING: уведомление об изменении пользователя
+    отправляется тем же запросом, что и изменение
+    :param user_id: колонка id пользователя
+    :type user_id: ColumnElement
+    :rtype: ColumnElement
+    """
+    return func.pg_notify(setting.principal_cache.channel, cast(user_id, String))
+
+
+class InvalidationListener:
+    """
+    Слушает канал LISTEN/NOTIFY и сбрасывает записи локального кеша
+    """
+
+    def __init__(self, cache: PrincipalCache, channel: str) -> None:
+        self.cache = cache
+        self.channel = channel
+        self._conn: Optional[asyncpg.Connection] = None
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        if payload == INVALIDATE_ALL:
+            self.cache.clear()
+            return
+        try:
+            self.cache.invalidate(int(payload))
+        except ValueError:
+            logger.warning("Bad invalidation payload %r", payload)
+
+    async def start(self) -> None:
+        dsn: str = (
+            make_url(setting.db.url)
+            .set(drivername="postgresql")
+            .render_as_string(hide_password=False)
+        )
+        try:
+            self._conn = await asyncpg.connect(dsn)
+            await self._conn.add_listener(self.channel, self._on_notify)
+        except (OSError, asyncpg.PostgresError) as exc:
+            logger.warning("Principal invalidation listener not started: %s", exc)
+            self._conn = None
+
+    async def stop(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+
+invalidation_listener = InvalidationListener(
+    cache=principal_cache,
+    channel=setting.principal_cache.channel,
+)
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from pathlib import Path
+from types import FrameType
+from typing import Optional
+
+import jwt
+from fastapi import Response
+from fastapi.exceptions import HTTPException
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import BASE_DIR, COOKIE_NAME, setting
+from src.core.database import get_async_session
+from src.core.log_config import request_id_var
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIX = ".folded"
+PROFILE_NAME = re.compile(r"^[\w.-]+\.folded$")
+_UNSAFE = re.compile(r"[^\w-]+")
+
+current_profiler: ContextVar[Optional["SamplingProfiler"]] = ContextVar(
+    "current_profiler", default=None
+)
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    filename: str = code.co_filename
+    if filename.startswith(str(BASE_DIR)):
+        filename = os.path.relpath(filename, BASE_DIR)
+    else:
+        filename = os.path.join(*Path(filename).parts[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Семплирующий профилировщик одного HTTP-запроса. Отдельный поток с интервалом
+    interval снимает стек потока event loop; стек учитывается, только если
+    в этот момент выполняется задача профилируемого запроса. Результат - стеки
+    в формате folded (flamegraph.pl, speedscope)
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter[str] = Counter()
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _owns(self, task: Optional[asyncio.Task]) -> bool:
+        if task is None:
+            return False
+        get_context = getattr(task, "get_context", None)
+        if get_context is None:
+            return True
+        return get_context().get(current_profiler) is self
+
+    def _sample(self) -> None:
+        if not self._owns(asyncio.current_task(self._loop)):
+            return
+        frame: Optional[FrameType] = sys._current_frames().get(self._thread_id)
+        names: list[str] = []
+        while frame is not None:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        if names:
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def _prune(directory: Path, keep: int) -> None:
+    profiles: list[Path] = sorted(directory.glob(f"*{PROFILE_SUFFIX}"))
+    for path in profiles[: max(len(profiles) - keep, 0)]:
+        path.unlink(missing_ok=True)
+
+
+def save_profile(profiler: SamplingProfiler, method: str, path: str) -> Optional[Path]:
+    """
+    Сохраняет профиль в каталог profiling.path (старые профили удаляются)
+    :param profiler: профилировщик
+    :type profiler: SamplingProfiler
+    :param method: метод запроса
+    :type method: str
+    :param path: путь запроса
+    :type path: str
+    :rtype: Optional[Path]
+    :return: путь к файлу или None, если не удалось сохранить
+    """
+    directory = Path(setting.profiling.path)
+    stamp: str = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    slug: str = _UNSAFE.sub("_", path).strip("_")[:60] or "root"
+    name: str = f"{stamp}-{method}-{slug}-{request_id_var.get()}{PROFILE_SUFFIX}"
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        target: Path = directory / name
+        target.write_text(profiler.folded())
+        _prune(directory, setting.profiling.max_profiles)
+    except OSError as exc:
+        logger.warning("Failed to save profile: %s", exc)
+        return None
+    return target
+
+
+def list_profiles() -> list[dict]:
+    """
+    Сохраненные профили, новые первыми
+    :rtype: list[dict]
+    """
+    directory = Path(setting.profiling.path)
+    if not directory.is_dir():
+        return []
+    profiles: list[dict] = []
+    for path in sorted(directory.glob(f"*{PROFILE_SUFFIX}"), reverse=True):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        profiles.append(
+            {
+                "name": path.name,
+                "size": stat.st_size,
+                "created": datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+            }
+        )
+    return profiles
+
+
+def profile_path(name: str) -> Optional[Path]:
+    """
+    Путь к сохраненному профилю по имени файла
+    :param name: имя файла
+    :type name: str
+    :rtype: Optional[Path]
+    :return: путь или None, если имя недопустимо или файла нет
+    """
+    if not PROFILE_NAME.match(name):
+        return None
+    path: Path = Path(setting.profiling.path) / name
+    return path if path.is_file() else None
+
+
+async def _requested_by_superuser(scope: Scope) -> bool:
+    header: bytes = setting.profiling.header.lower().encode()
+    cookie: Optional[str] = None
+    requested = False
+    for name, value in scope["headers"]:
+        if name == header:
+            requested = value.strip() not in (b"", b"0", b"false")
+        elif name == b"cookie":
+            cookie = value.decode("latin-1")
+    if not requested or cookie is None:
+        return False
+    morsel = SimpleCookie(cookie).get(COOKIE_NAME)
+    if morsel is None:
+        return False
+
+    # та же проверка, что у current_superuser_user: отзыв токена, версия
+    # пользователя и его текущая роль, а не только claim role из токена
+    # (импорт здесь: src.api_v1 импортирует этот модуль)
+    from src.api_v1.users.depends import current_superuser_user
+
+    overrides: dict = getattr(scope.get("app"), "dependency_overrides", {})
+    session_factory = overrides.get(get_async_session, get_async_session)
+    try:
+        async with asynccontextmanager(session_factory)() as session:
+            await current_superuser_user(
+                response=Response(), token=morsel.value, session=session
+            )
+    except (HTTPException, jwt.InvalidTokenError):
+        return False
+    return True
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware: профилирует запрос целиком (зависимости, CRUD,
+    сериализация), если его прислал superuser с заголовком profiling.header
+    или запрос попал в случайную выборку sample_rate
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        conf = setting.profiling
+        if scope["type"] != "http" or not conf.enabled:
+            await self.app(scope, receive, send)
+            return
+        if not (
+            random.random() < conf.sample_rate or await _requested_by_superuser(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = SamplingProfiler(conf.interval_seconds)
+        token = current_profiler.set(profiler)
+        start: float = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.stop()
+            current_profiler.reset(token)
+            target: Optional[Path] = await asyncio.to_thread(
+                save_profile, profiler, scope["method"], scope["path"]
+            )
+            logger.info(
+                "Profiled %s %s: %d samples in %.3fs -> %s",
+                scope["method"],
+                scope["path"],
+                profiler.samples,
+                time.perf_counter() - start,
+                target.name if target is not None else None,
+            )
@@ -0,0 +1,173 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import setting
+
+logger = logging.getLogger(__name__)
+
+QUERY_START_KEY = "query_start_time"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def redact_statement(statement: str) -> str:
+    """
+    Приводит текст запроса к виду для логов: литералы заменяются на ?,
+    пробелы схлопываются, длина ограничивается (параметры $n не выводятся)
+    :param statement: текст запроса
+    :type statement: str
+    :rtype: str
+    """
+    statement = _STRING_LITERAL.sub("'?'", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return statement[: setting.sql_stats.max_statement_length]
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    db_seconds: float = 0.0
+    slowest_seconds: float = 0.0
+    slowest_statement: Optional[str] = None
+    statements: Counter[str] = field(default_factory=Counter)
+    parent: Optional["QueryStats"] = field(default=None, repr=False)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        stats: Optional[QueryStats] = self
+        while stats is not None:
+            stats.count += 1
+            stats.db_seconds += elapsed
+            stats.statements[statement] += 1
+            if elapsed > stats.slowest_seconds:
+                stats.slowest_seconds = elapsed
+                stats.slowest_statement = statement
+            stats = stats.parent
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """
+        Запросы, выполненные не менее threshold раз (признак N+1)
+        :param threshold: порог
+        :type threshold: int
+        :rtype: dict[str, int]
+        """
+        return {
+            statement: count
+            for statement, count in self.statements.items()
+            if count >= threshold
+        }
+
+
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info[QUERY_START_KEY] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    start: Optional[float] = conn.info.pop(QUERY_START_KEY, None)
+    if start is None:
+        return
+    elapsed: float = time.perf_counter() - start
+    stats: Optional[QueryStats] = current_query_stats.get()
+    slow: bool = elapsed >= setting.sql_stats.slow_query_seconds
+    if stats is None and not slow:
+        return
+    redacted: str = redact_statement(statement)
+    if stats is not None:
+        stats.record(redacted, elapsed)
+    if slow:
+        logger.warning("Slow query %.3fs: %s", elapsed, redacted)
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Считает запросы к БД внутри блока и проверяет, что их не больше max_queries
+    (для тестов: with query_budget(3): await client.get(...))
+    :param max_queries: допустимое число запросов
+    :type max_queries: int
+    :rtype: Iterator[QueryStats]
+    """
+    stats = QueryStats(parent=current_query_stats.get())
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+    assert stats.count <= max_queries, (
+        f"{stats.count} queries executed, budget is {max_queries}: "
+        f"{dict(stats.statements)}"
+    )
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware: собирает по каждому HTTP-запросу число запросов к БД,
+    суммарное время и самый медленный запрос, предупреждает о N+1
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not setting.sql_stats.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(parent=current_query_stats.get())
+        token = current_query_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            if (
+                message["type"] == "http.response.start"
+                and setting.sql_stats.response_headers
+            ):
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-db-queries", str(stats.count).encode()),
+                    (b"server-timing", f"db;dur={stats.db_seconds * 1000:.1f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_query_stats.reset(token)
+            for statement, count in stats.repeated(
+                setting.sql_stats.n_plus_one_threshold
+            ).items():
+                logger.warning(
+                    "Possible N+1 on %s %s: %d x %s",
+                    scope["method"],
+                    scope["path"],
+                    count,
+                    statement,
+                )
+            if stats.slowest_statement is not None:
+                logger.debug(
+                    "%s %s: %d queries, %.3fs in db, slowest %.3fs: %s",
+                    scope["method"],
+                    scope["path"],
+                    stats.count,
+                    stats.db_seconds,
+                    stats.slowest_seconds,
+                    stats.slowest_statement,
+                )
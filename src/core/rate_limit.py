@@ -0,0 +1,151 @@
+import fcntl
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+
+import jwt
+from fastapi import HTTPException, Request, status
+
+from src.core.config import COOKIE_NAME, RateLimitRule, setting
+from src.core.jwt_utils import decode_jwt
+
+logger = logging.getLogger(__name__)
+
+# key hash, tokens, updated (unix time)
+SLOT = struct.Struct("<Qdd")
+PROBES = 4
+
+
+class SharedBucketStore:
+    """
+    Хранилище token bucket в файле, отображенном в память (mmap). Файл общий для
+    всех воркеров gunicorn, доступ сериализуется блокировкой flock
+    """
+
+    def __init__(self, path: str, slots: int) -> None:
+        self.slots = slots
+        size = slots * SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                os.ftruncate(self._fd, size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def _find_slot(self, key_hash: int, now: float, stale: float) -> int:
+        start = key_hash % self.slots
+        victim, victim_updated = start, math.inf
+        for i in range(PROBES):
+            index = (start + i) % self.slots
+            slot_hash, _, updated = SLOT.unpack_from(self._map, index * SLOT.size)
+            if slot_hash == key_hash:
+                return index
+            if slot_hash == 0 or now - updated > stale:
+                return index
+            if updated < victim_updated:
+                victim, victim_updated = index, updated
+        return victim
+
+    def take(self, key: str, rule: RateLimitRule, cost: float = 1.0) -> float:
+        """
+        Списывает токены из корзины ключа
+        :param key: ключ корзины (группа, пользователь или ip)
+        :type key: str
+        :param rule: скорость пополнения и емкость корзины
+        :type rule: RateLimitRule
+        :param cost: стоимость запроса
+        :type cost: float
+        :rtype: float
+        :return: 0, если запрос разрешен, иначе - через сколько секунд повторить
+        """
+        key_hash = self._hash(key)
+        now = time.time()
+        stale = rule.burst / rule.rate
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            index = self._find_slot(key_hash, now, stale)
+            offset = index * SLOT.size
+            slot_hash, tokens, updated = SLOT.unpack_from(self._map, offset)
+            if slot_hash != key_hash:
+                tokens, updated = float(rule.burst), now
+            tokens = min(float(rule.burst), tokens + (now - updated) * rule.rate)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rule.rate
+            SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return retry_after
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+_store: Optional[SharedBucketStore] = None
+
+
+def get_bucket_store() -> SharedBucketStore:
+    global _store
+    if _store is None:
+        _store = SharedBucketStore(
+            path=setting.rate_limit.path,
+            slots=setting.rate_limit.slots,
+        )
+    return _store
+
+
+class RateLimit:
+    """
+    Зависимость FastAPI: ограничение частоты запросов к группе маршрутов
+    отдельно по ip клиента и по пользователю (sub из токена)
+    """
+
+    def __init__(self, group: str) -> None:
+        self.group = group
+
+    async def _user_key(self, request: Request) -> Optional[str]:
+        token: Optional[str] = request.cookies.get(COOKIE_NAME)
+        if token is None:
+            return None
+        try:
+            payload: dict = await decode_jwt(token)
+        except jwt.InvalidTokenError:
+            return None
+        return f"{self.group}:user:{payload.get('sub')}"
+
+    async def __call__(self, request: Request) -> None:
+        rule: Optional[RateLimitRule] = setting.rate_limit.groups.get(self.group)
+        if not setting.rate_limit.enabled or rule is None:
+            return
+
+        keys: list[str] = []
+        if request.client is not None:
+            keys.append(f"{self.group}:ip:{request.client.host}")
+        user_key: Optional[str] = await self._user_key(request)
+        if user_key is not None:
+            keys.append(user_key)
+
+        store: SharedBucketStore = get_bucket_store()
+        retry_after: float = max((store.take(key, rule) for key in keys), default=0.0)
+        if retry_after > 0:
+            logger.info("Rate limit exceeded for group %s", self.group)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
@@ -0,0 +1,64 @@
+from typing import Iterable, Optional
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.engine import Row
+
+
+def _with_sub_response(
+    result: ORJSONResponse, response: Optional[Response]
+) -> ORJSONResponse:
+    """
+    Переносит заголовки, выставленные зависимостями в Response (например,
+    обновленную cookie токена): FastAPI не добавляет их, если обработчик
+    сам возвращает Response
+    :param result: ответ обработчика
+    :type result: ORJSONResponse
+    :param response: Response зависимостей
+    :type response: Optional[Response]
+    :rtype: ORJSONResponse
+    """
+    if response is not None:
+        result.headers.raw.extend(
+            (name, value)
+            for name, value in response.headers.raw
+            if name != b"content-length"
+        )
+    return result
+
+
+def rows_response(
+    rows: Iterable[Row],
+    status_code: int = 200,
+    headers: Optional[dict[str, str]] = None,
+    response: Optional[Response] = None,
+) -> ORJSONResponse:
+    """
+    Сериализует строки Core-запроса напрямую в JSON, минуя ORM-объекты
+    и повторную валидацию pydantic (ключи - имена колонок в порядке запроса)
+    :param rows: строки результата
+    :type rows: Iterable[Row]
+    :param status_code: код ответа
+    :type status_code: int
+    :param headers: дополнительные заголовки ответа
+    :type headers: Optional[dict[str, str]]
+    :param response: Response зависимостей (его заголовки, например Set-Cookie, переносятся в ответ)
+    :type response: Optional[Response]
+    :rtype: ORJSONResponse
+    """
+    return _with_sub_response(
+        ORJSONResponse(
+            content=[row._asdict() for row in rows],
+            status_code=status_code,
+            headers=headers,
+        ),
+        response,
+    )
+
+
+def row_response(
+    row: Row, status_code: int = 200, response: Optional[Response] = None
+) -> ORJSONResponse:
+    return _with_sub_response(
+        ORJSONResponse(content=row._asdict(), status_code=status_code), response
+    )
@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.config import setting
+from src.core.database import async_session_maker
+from src.core.exceptions import ExceptDB
+from src.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума: отрицательный ответ точен, положительный - с вероятностью
+    ложного срабатывания error_rate
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+    """
+    Список отозванных токенов воркера. Идентификаторы (jti) хранятся в таблице
+    revokedtokens и подгружаются в фильтр Блума инкрементально (по id), поэтому
+    проверка не отозванного токена обходится без запроса к БД
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        refresh_seconds: float,
+        session_factory: async_sessionmaker = async_session_maker,
+    ) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.session_factory = session_factory
+        self.exact_checks = 0
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._last_refresh = 0.0
+        self._rebuild_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def _load(session: AsyncSession, bloom: BloomFilter, last_id: int) -> int:
+        stmt = (
+            select(RevokedToken.id, RevokedToken.jti)
+            .where(RevokedToken.id > last_id)
+            .order_by(RevokedToken.id)
+        )
+        result: Result = await session.execute(stmt)
+        for row_id, jti in result.all():
+            bloom.add(jti)
+            last_id = row_id
+        return last_id
+
+    async def rebuild(self) -> None:
+        """
+        Удаляет истекшие записи и заново строит фильтр в отдельной сессии;
+        до замены проверки идут по прежнему фильтру
+        """
+        logger.info("Revocation filter is full, rebuilding")
+        try:
+            async with self.session_factory() as session:
+                await session.execute(
+                    delete(RevokedToken).where(
+                        RevokedToken.expires_at <= datetime.now(timezone.utc)
+                    )
+                )
+                await session.commit()
+                bloom = BloomFilter(self.capacity, self.error_rate)
+                last_id: int = await self._load(session, bloom, 0)
+        except SQLAlchemyError as exc:
+            logger.exception("Error in data base %s", exc)
+            return
+        # отозванные во время перестроения (id > last_id) догрузит refresh
+        self._bloom, self._last_id = bloom, last_id
+
+    async def refresh(self, session: AsyncSession) -> None:
+        """
+        Догружает в фильтр записи, появившиеся с прошлого обновления
+        (только чтение; переполненный фильтр перестраивается фоновой задачей)
+        :param session: сессия БД
+        :type session: AsyncSession
+        """
+        if time.monotonic() - self._last_refresh < self.refresh_seconds:
+            return
+        self._last_refresh = time.monotonic()
+
+        if self._bloom.count >= self.capacity and (
+            self._rebuild_task is None or self._rebuild_task.done()
+        ):
+            self._rebuild_task = asyncio.create_task(self.rebuild())
+
+        bloom: BloomFilter = self._bloom
+        last_id: int = await self._load(session, bloom, self._last_id)
+        # фильтр могли заменить, пока шел запрос: тогда строки догрузятся в новый
+        if bloom is self._bloom:
+            self._last_id = last_id
+
+    async def is_revoked(self, session: AsyncSession, jti: str) -> bool:
+        """
+        Проверяет, отозван ли токен
+        :param session: сессия БД
+        :type session: AsyncSession
+        :param jti: идентификатор токена
+        :type jti: str
+        :rtype: bool
+        :return: True, если токен отозван
+        """
+        await self.refresh(session)
+        if jti not in self._bloom:
+            return False
+        self.exact_checks += 1
+        stmt = select(RevokedToken.id).where(RevokedToken.jti == jti)
+        result: Result = await session.execute(stmt)
+        return result.scalar_one_or_none() is not None
+
+    async def revoke(self, session: AsyncSession, jti: str, expires_at: datetime) -> None:
+        """
+        Отзывает токен (повторный отзыв того же токена не ошибка)
+        :param session: сессия БД
+        :type session: AsyncSession
+        :param jti: идентификатор токена
+        :type jti: str
+        :param expires_at: срок действия токена
+        :type expires_at: datetime
+        :raises ExceptDB: ошибка базы данных
+        """
+        logger.info("Revoke token %s", jti)
+        try:
+            await session.execute(
+                insert(RevokedToken)
+                .values(jti=jti, expires_at=expires_at)
+                .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+            )
+            await session.commit()
+        except SQLAlchemyError as exc:
+            logger.exception("Error in data base %s", exc)
+            await session.rollback()
+            raise ExceptDB(exc)
+        self._bloom.add(jti)
+
+    def stats(self) -> dict:
+        return {
+            "size": self._bloom.count,
+            "capacity": self.capacity,
+            "exact_checks": self.exact_checks,
+        }
+
+
+revocation_list = RevocationList(
+    capacity=setting.revocation.capacity,
+    error_rate=setting.revocation.error_rate,
+    refresh_seconds=setting.revocation.refresh_seconds,
+)
@@ -0,0 +1,19 @@
+from typing import Mapping, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def longest_prefix_match(path: str, mapping: Mapping[str, T]) -> Optional[T]:
+    """
+    Значение для самого длинного префикса, с которого начинается путь
+    :param path: путь запроса
+    :type path: str
+    :param mapping: префиксы путей и их значения
+    :type mapping: Mapping[str, T]
+    :rtype: Optional[T]
+    :return: значение или None, если ни один префикс не совпал
+    """
+    prefixes = [prefix for prefix in mapping if path.startswith(prefix)]
+    if not prefixes:
+        return None
+    return mapping[max(prefixes, key=len)]
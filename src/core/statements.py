@@ -0,0 +1,79 @@
+from collections import Counter
+from typing import Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.sql import Executable
+
+StatementT = TypeVar("StatementT", bound=Executable)
+
+STATEMENT_NAME_OPTION = "statement_name"
+
+
+class StatementRegistry:
+    """
+    Реестр горячих запросов. Запросы строятся один раз при импорте модуля,
+    значения передаются через bindparam, поэтому ключ кеша компиляции
+    SQLAlchemy и подготовленное выражение asyncpg переиспользуются
+    """
+
+    def __init__(self) -> None:
+        self._statements: dict[str, Executable] = dict()
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    def add(self, name: str, statement: StatementT) -> StatementT:
+        """
+        Регистрирует запрос
+        :param name: имя запроса
+        :type name: str
+        :param statement: запрос с bindparam вместо значений
+        :type statement: Executable
+        :rtype: Executable
+        :return: запрос, помеченный именем (для статистики кеша компиляции)
+        """
+        if name in self._statements:
+            raise ValueError(f"Statement {name} already registered")
+        statement = statement.execution_options(**{STATEMENT_NAME_OPTION: name})
+        self._statements[name] = statement
+        return statement
+
+    def __getitem__(self, name: str) -> Executable:
+        return self._statements[name]
+
+    def record(self, name: Optional[str], cache_hit) -> None:
+        name = name or "<other>"
+        if cache_hit is CACHE_HIT:
+            self.hits[name] += 1
+        elif cache_hit is CACHE_MISS:
+            self.misses[name] += 1
+
+    @property
+    def hit_rate(self) -> float:
+        hits: int = sum(self.hits.values())
+        total: int = hits + sum(self.misses.values())
+        return hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        names = sorted(set(self._statements) | set(self.hits) | set(self.misses))
+        return {
+            "hit_rate": round(self.hit_rate, 4),
+            "statements": {
+                name: {"hits": self.hits[name], "misses": self.misses[name]}
+                for name in names
+            },
+        }
+
+
+statements = StatementRegistry()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_compile_cache(conn, cursor, statement, parameters, context, executemany):
+    if context is None:
+        return
+    statements.record(
+        context.execution_options.get(STATEMENT_NAME_OPTION),
+        getattr(context, "cache_hit", None),
+    )
@@ -0,0 +1,79 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from src.core.config import setting
+
+
+class TokenCache:
+    """
+    LRU-кеш проверенных jwt-токенов. Ключ - дайджест токена, запись удаляется
+    по истечении срока действия токена (claim exp)
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    @staticmethod
+    def digest(token: str | bytes, key: str, algorithm: str) -> str:
+        """
+        Дайджест токена (вместе с ключом и алгоритмом проверки подписи)
+        :param token: jwt-токен
+        :type token: str | bytes
+        :param key: секретный ключ
+        :type key: str
+        :param algorithm: алгоритм шифрования
+        :type algorithm: str
+        :rtype: str
+        :return: sha256 в виде hex-строки
+        """
+        if isinstance(token, str):
+            token = token.encode()
+        hasher = hashlib.sha256()
+        hasher.update(f"{algorithm}:{key}:".encode())
+        hasher.update(token)
+        return hasher.hexdigest()
+
+    def get(self, digest: str) -> Optional[dict]:
+        entry = self._data.get(digest)
+        if entry is None:
+            self.misses += 1
+            return None
+        expire, payload = entry
+        if time.time() >= expire:
+            del self._data[digest]
+            self.misses += 1
+            return None
+        self._data.move_to_end(digest)
+        self.hits += 1
+        return dict(payload)
+
+    def put(self, digest: str, payload: dict) -> None:
+        expire = payload.get("exp")
+        if self.maxsize <= 0 or expire is None:
+            return
+        self._data[digest] = (float(expire), dict(payload))
+        self._data.move_to_end(digest)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, digest: str) -> None:
+        self._data.pop(digest, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+token_cache = TokenCache(maxsize=setting.auth_jwt.token_cache_size)
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.exceptions import NotFindUser
+from src.api_v1.books.crud import get_book, get_book_row
+from src.api_v1.users.crud import find_user_by_email, get_user_by_id, get_user_from_db
+
+logger = logging.getLogger(__name__)
+
+WARMUP_EMAIL = "warmup@localhost"
+
+
+async def _hot_queries(session: AsyncSession) -> None:
+    await get_book(session=session, book_id=0)
+    await get_book_row(session=session, book_id=0)
+    await get_user_by_id(session=session, id_user=0)
+    await find_user_by_email(session=session, email=WARMUP_EMAIL)
+    try:
+        await get_user_from_db(session=session, email=WARMUP_EMAIL)
+    except NotFindUser:
+        pass
+
+
+HOT_QUERIES: list[Callable[[AsyncSession], Awaitable[None]]] = [_hot_queries]
+
+
+async def warm_up(session_maker: async_sessionmaker, connections: int) -> None:
+    """
+    Открывает connections соединений пула и выполняет на каждом горячие запросы
+    (установка соединения, интроспекция типов asyncpg, компиляция запросов
+    SQLAlchemy и подготовленные выражения происходят до первых запросов клиентов)
+    :param session_maker: фабрика сессий
+    :type session_maker: async_sessionmaker
+    :param connections: количество соединений
+    :type connections: int
+    """
+
+    async def _warm_connection() -> None:
+        async with session_maker() as session:
+            for query in HOT_QUERIES:
+                await query(session)
+            await session.rollback()
+
+    if connections <= 0:
+        return
+    try:
+        await asyncio.gather(*(_warm_connection() for _ in range(connections)))
+    except (OSError, SQLAlchemyError) as exc:
+        logger.warning("Connection pool warm-up failed: %s", exc)
+    else:
+        logger.info("Connection pool warmed up with %d connections", connections)
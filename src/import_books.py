@@ -0,0 +1,88 @@
+"""
+Массовый импорт книг из файла CSV или JSON Lines:
+
+    python -m src.import_books books.csv
+    python -m src.import_books books.jsonl
+    cat books.csv | python -m src.import_books - --format csv
+
+Отчет (JSON) выводится в stdout, код возврата 1, если были ошибочные строки
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+
+import orjson
+
+from src.api_v1.books.importer import ImportFormat, import_books, read_records
+from src.api_v1.books.schemas import BookImportReportSchemas
+from src.core.config import setting
+from src.core.database import async_session_maker, engine
+from src.core.log_config import setup_logging
+
+SUFFIX_FORMATS: dict[str, ImportFormat] = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+async def read_chunks(file: BinaryIO, size: int) -> AsyncIterator[bytes]:
+    """
+    Читает файл блоками, не блокируя event loop
+    :param file: файл
+    :type file: BinaryIO
+    :param size: размер блока
+    :type size: int
+    :rtype: AsyncIterator[bytes]
+    """
+    while chunk := await asyncio.to_thread(file.read, size):
+        yield chunk
+
+
+async def run_import(file: BinaryIO, file_format: ImportFormat) -> BookImportReportSchemas:
+    try:
+        async with async_session_maker() as session:
+            return await import_books(
+                session=session,
+                records=read_records(
+                    file_format, read_chunks(file, setting.book_import.read_size)
+                ),
+            )
+    finally:
+        await engine.dispose()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import books from CSV/JSONL")
+    parser.add_argument("path", help="file to import, '-' for stdin")
+    parser.add_argument(
+        "--format",
+        dest="file_format",
+        choices=["csv", "jsonl"],
+        help="file format (by default - by file extension)",
+    )
+    args = parser.parse_args(argv)
+
+    file_format: Optional[ImportFormat] = args.file_format
+    if file_format is None:
+        file_format = SUFFIX_FORMATS.get(Path(args.path).suffix.lower())
+        if file_format is None:
+            parser.error("cannot detect file format, use --format")
+
+    setup_logging()
+    if args.path == "-":
+        report = asyncio.run(run_import(sys.stdin.buffer, file_format))
+    else:
+        with open(args.path, "rb") as file:
+            report = asyncio.run(run_import(file, file_format))
+    sys.stdout.write(
+        orjson.dumps(report.model_dump(), option=orjson.OPT_INDENT_2).decode() + "\n"
+    )
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
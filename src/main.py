@@ -1,13 +1,31 @@
 import logging
+import time
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 
 import uvicorn
 
 from src.api_v1 import router as api_router
-from src.core.config import configure_logging
+from src.core.config import READ_YOUR_WRITES_COOKIE_NAME, setting
+from src.core.database import (
+    async_session_maker,
+    engine,
+    replica_engines,
+    replica_session_makers,
+)
+from src.core.deadline import DeadlineMiddleware
+from src.core.load_shedding import LoadSheddingMiddleware
+from src.core.log_config import RequestIdMiddleware, setup_logging
+from src.core.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+from src.core.pagination import NEXT_CURSOR_HEADER
+from src.core.profiling import ProfilingMiddleware
+from src.core.query_stats import QueryStatsMiddleware
+from src.core.warmup import warm_up
+from src.core.hashing import shutdown_password_executor
+from src.core.principal_cache import invalidation_listener
 
 description = """
     API library management
@@ -19,24 +37,68 @@ description = """
     * **book borrow/return**
 """
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await invalidation_listener.start()
+    for session_maker in [async_session_maker, *replica_session_makers]:
+        await warm_up(session_maker, setting.db.warmup_connections)
+    yield
+    await invalidation_listener.stop()
+    shutdown_password_executor()
+    metrics.flush(force=True)
+    for db_engine in [engine, *replica_engines]:
+        await db_engine.dispose()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="API_ManagementLibrary",
     description=description,
     version="0.1.0",
     docs_url="/docs",
 )
 
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(LoadSheddingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(router=api_router)
 
-configure_logging(logging.INFO)
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    response: Response = await call_next(request)
+    if (
+        replica_engines
+        and request.method not in SAFE_METHODS
+        and response.status_code < 400
+    ):
+        window: float = setting.db.read_your_writes_seconds
+        response.set_cookie(
+            key=READ_YOUR_WRITES_COOKIE_NAME,
+            value=str(time.time() + window),
+            max_age=int(window) + 1,
+            httponly=True,
+            samesite="lax",
+            path="/",
+        )
+    return response
+
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -45,5 +107,10 @@ def index(response: Response):
     return HTMLResponse("<h2> Library Management </h2>")
 
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     uvicorn.run("main:app", reload=True)
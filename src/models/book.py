@@ -1,7 +1,17 @@
 from __future__ import annotations
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import String, Integer, CheckConstraint
+from sqlalchemy import (
+    DDL,
+    CheckConstraint,
+    Computed,
+    Index,
+    Integer,
+    String,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 
 from src.models.base import Base
@@ -9,6 +19,14 @@ from src.models.base import Base
 if TYPE_CHECKING:
     from src.models.library import ReceivingBook
 
+# конфигурация полнотекстового поиска: каталог многоязычный, поэтому без стемминга
+SEARCH_CONFIG = "simple"
+SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(author, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'C')"
+)
+
 
 class Book(Base):
     __table_args__ = (
@@ -17,6 +35,39 @@ class Book(Base):
             "release_date >= 1000 AND release_date <= 9999",
             name="release_date_four_digits",
         ),
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_books_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_books_author_trgm",
+            "author",
+            postgresql_using="gin",
+            postgresql_ops={"author": "gin_trgm_ops"},
+        ),
+        # фильтры и сортировки /api/books/list (keyset: колонка сортировки, id)
+        Index("ix_books_author_release_date", "author", "release_date", "id"),
+        Index("ix_books_author_id", "author", "id"),
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_release_date_id", "release_date", "id"),
+        # release_date допускает NULL: для убывающей сортировки (NULLS LAST)
+        # обратный проход ix_books_release_date_id не подходит
+        Index(
+            "ix_books_release_date_desc_id",
+            text("release_date DESC NULLS LAST"),
+            text("id DESC"),
+        ),
+        Index(
+            "ix_books_title_pattern",
+            "title",
+            postgresql_ops={"title": "varchar_pattern_ops"},
+        ),
+        # предикат ссылается на count, поэтому выдача/возврат книги
+        # (UPDATE count) не может быть HOT - второго такого индекса не заводим
+        Index("ix_books_available_id", "id", postgresql_where=text("count > 0")),
     )
 
     title: Mapped[str] = mapped_column(String(100), index=True)
@@ -41,6 +92,11 @@ class Book(Base):
         String(100),
         nullable=True,
     )
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(SEARCH_VECTOR, persisted=True),
+        deferred=True,
+    )
 
     users: Mapped[list["ReceivingBook"]] = relationship(back_populates="book")
 
@@ -60,3 +116,11 @@ class Book(Base):
 
     def __str__(self):
         return f"Book id:{self.id} title: {self.title} release date:{self.release_date}"
+
+
+# индексы gin_trgm_ops требуют расширения pg_trgm (в миграциях создается отдельно)
+event.listen(
+    Book.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"),
+)
@@ -0,0 +1,103 @@
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+
+from src.api_v1.books.importer import (
+    iter_csv_records,
+    iter_jsonl_records,
+    validate_book,
+)
+from src.core.exceptions import ErrorInData
+
+
+async def chunks(data: bytes, size: int) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(records) -> list:
+    return [record async for record in records]
+
+
+CSV_DATA: bytes = (
+    "﻿title,author,release_date,isbn,count\r\n"
+    '"Война и\n""мир""",Лев Толстой,1869,978-5-17-090835-4,3\r\n'
+    "\n"
+    "Без года,Автор,,,\n"
+    "Мало колонок,Автор\n"
+    '"Не закрыта,Автор,,,\n'
+).encode()
+
+
+@pytest.mark.parametrize("size", [1, 7, 1 << 16])
+async def test_csv_records(size: int, event_loop: asyncio.AbstractEventLoop):
+    records = await collect(iter_csv_records(chunks(CSV_DATA, size)))
+    assert records == [
+        (
+            2,
+            {
+                "title": 'Война и\n"мир"',
+                "author": "Лев Толстой",
+                "release_date": "1869",
+                "isbn": "978-5-17-090835-4",
+                "count": "3",
+            },
+        ),
+        (5, {"title": "Без года", "author": "Автор"}),
+        (6, ["csv: expected 5 columns, got 2"]),
+        (7, ["csv: unterminated quoted field"]),
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 7, 1 << 16])
+async def test_csv_stray_quotes(size: int, event_loop: asyncio.AbstractEventLoop):
+    data: bytes = (
+        b"title,author,count\n"
+        b'Album 12" LP,Someone,1\n'
+        b"Book A,Author A,2\n"
+        b"Book B,Author B,3\n"
+        b'Single 7" EP,Other,4\n'
+        b"Book D,Author D,5\n"
+    )
+    records = await collect(iter_csv_records(chunks(data, size)))
+    assert [line for line, _ in records] == [2, 3, 4, 5, 6]
+    assert records[0][1]["title"] == 'Album 12" LP'
+    assert records[3][1]["title"] == 'Single 7" EP'
+
+
+async def test_csv_header_required(event_loop: asyncio.AbstractEventLoop):
+    with pytest.raises(ErrorInData):
+        await collect(iter_csv_records(chunks(b"name,author\nA,B\n", 4)))
+
+
+async def test_jsonl_records(event_loop: asyncio.AbstractEventLoop):
+    data: bytes = b'{"title": "A", "author": "B"}\n[1]\n{bad\n\n{"title": "C"}'
+    records = await collect(iter_jsonl_records(chunks(data, 5)))
+    assert [line for line, _ in records] == [1, 2, 3, 5]
+    assert records[0][1] == {"title": "A", "author": "B"}
+    assert records[1][1] == ["json: expected an object"]
+    assert records[2][1][0].startswith("json:")
+    assert records[3][1] == {"title": "C"}
+
+
+def test_validate_book():
+    book = validate_book(
+        {"title": "A", "author": "B", "isbn": "978-5-17-090835-4", "count": "2"}
+    )
+    assert book.count == 2
+
+    assert validate_book({"title": "A", "author": "B", "isbn": "12-3"}) == [
+        "isbn: Invalid ISBN format"
+    ]
+    errors = validate_book({"title": "A", "release_date": "12"})
+    assert [error.split(":")[0] for error in errors] == ["author", "release_date"]
+    assert validate_book({"title": "A\x00", "author": "B"}) == [
+        "title: NUL character is not allowed"
+    ]
+    assert validate_book({"title": "A", "author": "B", "count": "3000000000"}) == [
+        "count: Input should be less than or equal to 2147483647"
+    ]
+    assert validate_book({"title": "A", "author": "B", "count": 2**31 - 1}).count == (
+        2**31 - 1
+    )
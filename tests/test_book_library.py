@@ -1,15 +1,24 @@
 import pytest
 from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy import select, text
 from sqlalchemy.engine import Result
 import asyncio
+import uuid
 
 from src.models.user import User
 from src.models.book import Book
-from src.core.config import COOKIE_NAME
-from src.api_v1.books.schemas import BookCreateSchemas
-from src.api_v1.library.schemas import ReceivingCreateSchemas
+from src.core.config import COOKIE_NAME, setting
+from src.core.jwt_utils import decode_jwt, encode_jwt
+from src.core.loader import BatchLoader
+from src.core.revocation import revocation_list
+from src.api_v1.books.crud import books_rows_stmt, get_books
+from src.api_v1.books.dependencies import book_by_id
+from src.api_v1.books.schemas import BookCreateSchemas, BookFilterSchemas, OutBookSchemas
+from src.api_v1.library.crud import get_books as get_books_user
+from src.api_v1.users.crud import get_principal_by_id
+from src.api_v1.library.schemas import ReceivingCreateSchemas, RecevingBookUserSchemas
 
 
 @pytest.mark.parametrize("title, author, count",
@@ -153,3 +162,396 @@ async def test_borrow_book_not_in_library(
     )
     assert response.status_code == 400
     assert response.json() == {"detail": "Not find book"}
+
+
+async def test_list_books_rows_equal_orm(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+        db_session: AsyncSession,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get("/api/books/list", cookies=cookies)
+
+    books_orm = await get_books(session=db_session)
+    expected = [
+        OutBookSchemas.model_validate(book).model_dump(mode="json") for book in books_orm
+    ]
+    assert response.status_code == 200
+    assert response.json() == expected
+
+    response = await client.get(f"/api/books/{books_orm[0].id}/", cookies=cookies)
+    assert response.status_code == 200
+    assert response.json() == expected[0]
+
+
+async def test_stale_stateless_token_refreshed(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+        test_user: User,
+        monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(setting.auth_jwt, "stateless", True)
+    payload: dict = await decode_jwt(token_admin)
+    payload["iat"] -= setting.auth_jwt.stateless_max_age_seconds + 1
+    cookies = {COOKIE_NAME: await encode_jwt(payload)}
+
+    for url in ("/api/books/list", f"/api/library/{test_user.id}/"):
+        response = await client.get(url, cookies=cookies)
+        assert response.status_code == 200
+        refreshed: str = response.cookies[COOKIE_NAME]
+        assert refreshed != cookies[COOKIE_NAME]
+        assert (await decode_jwt(refreshed))["iat"] > payload["iat"]
+
+
+async def test_book_user_rows_equal_orm(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+        test_user: User,
+        db_session: AsyncSession,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get(f"/api/library/{test_user.id}/", cookies=cookies)
+
+    books_orm = await get_books_user(session=db_session, user_id=test_user.id)
+    expected = [
+        RecevingBookUserSchemas.model_validate(book).model_dump(mode="json")
+        for book in books_orm
+    ]
+    key = lambda book: (book["title"], book["author"])
+    assert response.status_code == 200
+    assert sorted(response.json(), key=key) == sorted(expected, key=key)
+
+
+async def test_update_book_not_found(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.patch(
+        "/api/books/999/",
+        json={"count": 3},
+        cookies=cookies,
+    )
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Book 999 not found!"}
+
+
+async def test_batch_loader_book_by_id(
+        event_loop: asyncio.AbstractEventLoop,
+        db_engine: AsyncEngine,
+        query_budget,
+):
+    # отдельная сессия: identity map общей тестовой сессии уже содержит книги
+    async with async_sessionmaker(db_engine)() as session:
+        loader = BatchLoader(session)
+        loader.prime(Book, 1, 2, 3)
+        with query_budget(1) as stats:
+            books = [
+                await book_by_id(book_id=book_id, loader=loader)
+                for book_id in (1, 2, 3, 2)
+            ]
+        assert [book.id for book in books] == [1, 2, 3, 2]
+        assert stats.count == loader.queries == 1
+
+        # одиночные ключи разных моделей - один запрос с LEFT JOIN
+        loader.prime(User, 1)
+        with query_budget(1):
+            book: Book = await book_by_id(book_id=4, loader=loader)
+            user: User = await loader.load(User, 1)
+        assert (book.id, user.id) == (4, 1)
+        assert loader.queries == 2
+
+        with pytest.raises(HTTPException) as exc_info:
+            await book_by_id(book_id=999, loader=loader)
+        assert exc_info.value.status_code == 404
+
+
+async def test_update_book_empty_patch(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get("/api/books/2/", cookies=cookies)
+    assert response.status_code == 200
+    book: dict = response.json()
+
+    response = await client.patch("/api/books/2/", json={}, cookies=cookies)
+    assert response.status_code == 200
+    assert response.json() == book
+
+    response = await client.patch("/api/books/999/", json={}, cookies=cookies)
+    assert response.status_code == 404
+
+
+async def test_query_budget(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+        test_user_admin: User,
+        db_engine: AsyncEngine,
+        db_session: AsyncSession,
+        query_budget,
+        monkeypatch: pytest.MonkeyPatch,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    with query_budget(5):
+        response = await client.get("/api/books/1/", cookies=cookies)
+    assert response.status_code == 200
+
+    # читатель и книга создаются в отдельной сессии, чтобы их не было
+    # в identity map сессии запроса (иначе BatchLoader не выполнит запрос)
+    async with async_sessionmaker(db_engine, expire_on_commit=False)() as session:
+        reader = User(username="Budget", email=f"budget-{uuid.uuid4().hex}@mail.ru")
+        book = Book(title="Бюджет запросов", author="Тест", count=1)
+        session.add_all([reader, book])
+        await session.commit()
+
+    # состояние, от которого зависит число запросов авторизации:
+    # principal в кеше, список отзыва не обновляется
+    await get_principal_by_id(session=db_session, id_user=test_user_admin.id)
+    monkeypatch.setattr(revocation_list, "refresh_seconds", float("inf"))
+    await db_session.commit()
+
+    # set_config таймаутов в начале транзакции, книга и читатель (один запрос
+    # BatchLoader), активные выдачи читателя, INSERT выдачи, UPDATE count
+    with query_budget(5) as stats:
+        response = await client.post(
+            "/api/library/borrow",
+            json={"reader_id": reader.id, "book_id": book.id},
+            cookies=cookies,
+        )
+    assert response.status_code == 201
+    assert stats.count == 5, dict(stats.statements)
+    assert response.headers["x-db-queries"] == str(stats.count)
+
+
+@pytest.mark.parametrize("sort", ["id", "-title", "release_date", "-release_date"])
+async def test_list_books_keyset_pages(
+        sort: str,
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get("/api/books/list", params={"sort": sort}, cookies=cookies)
+    expected = response.json()
+
+    pages: list = []
+    params: dict = {"sort": sort, "limit": 2}
+    while True:
+        response = await client.get("/api/books/list", params=params, cookies=cookies)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        pages.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["next"] = cursor
+
+    assert pages == expected
+
+
+async def test_list_books_bad_cursor(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get(
+        "/api/books/list", params={"next": "broken"}, cookies=cookies
+    )
+    assert response.status_code == 400
+
+
+async def test_search_books(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get(
+        "/api/books/search", params={"q": "Пушкин"}, cookies=cookies
+    )
+    assert response.status_code == 200
+    assert [book["title"] for book in response.json()] == ["Капитанская дочка"]
+    assert response.json()[0]["rank"] > 0
+
+    response = await client.get(
+        "/api/books/search", params={"q": "Гарри Поттер"}, cookies=cookies
+    )
+    assert [book["title"] for book in response.json()] == [
+        "Гарри Поттер и философский камень"
+    ]
+
+    response = await client.get(
+        "/api/books/search",
+        params={"q": "Гарри Поттер", "available": True},
+        cookies=cookies,
+    )
+    assert response.json() == []
+
+
+@pytest.mark.parametrize(
+    "query, title",
+    [("Пушкен", "Капитанская дочка"), ("Толстои", "Анна Каренина"), ("Каренена", "Анна Каренина")],
+)
+async def test_fuzzy_books(
+        query: str, title: str,
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get(
+        "/api/books/fuzzy", params={"q": query, "threshold": 0.4}, cookies=cookies
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["title"] == title
+    assert 0.4 <= response.json()[0]["score"] <= 1
+
+
+# каталог, на котором планировщик выбирает индексы как в рабочей базе
+INSERT_CATALOG = text(
+    "INSERT INTO books (title, author, release_date, isbn, count) "
+    "SELECT 'Книга ' || n, 'Автор ' || (n % 100), 1000 + n % 1000, "
+    "CASE WHEN n % 50 = 0 THEN NULL ELSE lpad(n::text, 13, '0') END, n % 5 "
+    "FROM generate_series(1, 20000) AS n"
+)
+
+
+@pytest.mark.parametrize(
+    "sort, filters, index",
+    [
+        ("id", BookFilterSchemas(author="Автор 7"), "ix_books_author_id"),
+        (
+            "release_date",
+            BookFilterSchemas(author="Автор 7", release_from=1800),
+            "ix_books_author_release_date",
+        ),
+        (
+            "-release_date",
+            BookFilterSchemas(release_from=1800, release_to=1900),
+            "ix_books_release_date_desc_id",
+        ),
+        ("title", BookFilterSchemas(title_prefix="Книга 123"), "ix_books_title_pattern"),
+        ("id", BookFilterSchemas(available=True), "ix_books_available_id"),
+        ("id", BookFilterSchemas(has_isbn=False), "books_isbn_key"),
+        ("title", BookFilterSchemas(), "ix_books_title_id"),
+        ("-author", BookFilterSchemas(), "ix_books_author_id"),
+    ],
+)
+async def test_list_books_filters_use_indexes(
+        sort: str,
+        filters: BookFilterSchemas,
+        index: str,
+        event_loop: asyncio.AbstractEventLoop,
+        db_engine: AsyncEngine,
+):
+    stmt = books_rows_stmt(sort=sort, limit=20, filters=filters)
+    # запрос с параметрами $1, $2..., как его подготавливает asyncpg
+    compiled = stmt.compile(dialect=db_engine.dialect)
+    params: list = [compiled.params[name] for name in compiled.positiontup]
+    async with db_engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            await connection.execute(INSERT_CATALOG)
+            await connection.execute(text("ANALYZE books"))
+            # обобщенный план: значения параметров планировщику неизвестны
+            await connection.execute(text("SET LOCAL plan_cache_mode = force_generic_plan"))
+            # PREPARE не откатывается вместе с транзакцией - имя уникально
+            name: str = f"books_page_{uuid.uuid4().hex}"
+            values: str = ", ".join(
+                "'{}'".format(str(value).replace("'", "''")) for value in params
+            )
+            await connection.exec_driver_sql(f"PREPARE {name} AS {compiled}")
+            result: Result = await connection.exec_driver_sql(
+                f"EXPLAIN EXECUTE {name}({values})"
+            )
+            plan: str = "\n".join(row[0] for row in result.all())
+            await connection.exec_driver_sql(f"DEALLOCATE {name}")
+        finally:
+            await transaction.rollback()
+    assert f"{index} on books" in plan, plan
+    assert "Seq Scan" not in plan, plan
+
+
+async def test_list_books_filters(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get(
+        "/api/books/list",
+        params={"title_prefix": "Ка", "available": True, "sort": "-title"},
+        cookies=cookies,
+    )
+    assert response.status_code == 200
+    assert [book["title"] for book in response.json()] == ["Капитанская дочка"]
+
+    response = await client.get(
+        "/api/books/list", params={"author": "Лев Толстой"}, cookies=cookies
+    )
+    assert [book["title"] for book in response.json()] == ["Анна Каренина"]
+
+    response = await client.get(
+        "/api/books/list", params={"release_from": 999}, cookies=cookies
+    )
+    assert response.status_code == 422
+
+
+async def test_import_books(
+        event_loop: asyncio.AbstractEventLoop,
+        client: AsyncClient,
+        token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    csv_data: str = (
+        "title,author,release_date,isbn,count\n"
+        "Мастер и Маргарита,Михаил Булгаков,1967,978-5-389-01686-6,3\n"
+        "Собачье сердце,Михаил Булгаков,1925,12-34,1\n"
+        "Белая гвардия,Михаил Булгаков,,,2\n"
+    )
+    response = await client.post(
+        "/api/books/import",
+        content=csv_data.encode(),
+        headers={"Content-Type": "text/csv"},
+        cookies=cookies,
+    )
+    assert response.status_code == 200
+    report: dict = response.json()
+    assert (report["received"], report["inserted"], report["updated"]) == (3, 2, 0)
+    assert report["failed"] == 1
+    assert report["errors"] == [{"line": 3, "errors": ["isbn: Invalid ISBN format"]}]
+
+    jsonl_data: str = (
+        '{"title": "Мастер и Маргарита", "author": "Михаил Булгаков", '
+        '"isbn": "978-5-389-01686-6", "count": 7}\n'
+    )
+    response = await client.post(
+        "/api/books/import",
+        params={"format": "jsonl"},
+        content=jsonl_data.encode(),
+        cookies=cookies,
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["inserted"], report["updated"], report["failed"]) == (0, 1, 0)
+
+    response = await client.get(
+        "/api/books/list",
+        params={"author": "Михаил Булгаков", "sort": "title"},
+        cookies=cookies,
+    )
+    # release_date нет в строке JSONL - сохраняется; count импортом не меняется
+    assert [
+        (book["title"], book["release_date"], book["count"]) for book in response.json()
+    ] == [
+        ("Белая гвардия", None, 2),
+        ("Мастер и Маргарита", 1967, 3),
+    ]
@@ -0,0 +1,43 @@
+import asyncio
+
+from src.core.config import setting
+from src.core.deadline import DeadlineMiddleware, deadline_stats, rule_for_path
+from src.core.routing import longest_prefix_match
+
+
+def test_rule_for_path():
+    assert rule_for_path("/api/books/list") is setting.deadline.routes["/api/books/list"]
+    assert rule_for_path("/api/library/borrow") is setting.deadline.routes["/api/library/"]
+    assert rule_for_path("/api/users/list") is setting.deadline.default
+
+
+def test_longest_prefix_match():
+    mapping = {"/api/": 1, "/api/books/": 2, "/api/books/import": 3}
+    assert longest_prefix_match("/api/books/import", mapping) == 3
+    assert longest_prefix_match("/api/books/list", mapping) == 2
+    assert longest_prefix_match("/api/users/", mapping) == 1
+    assert longest_prefix_match("/docs", mapping) is None
+
+
+async def test_deadline_exceeded(event_loop: asyncio.AbstractEventLoop):
+    async def slow_app(scope, receive, send):
+        await asyncio.sleep(1)
+
+    messages: list[dict] = []
+
+    async def send(message):
+        messages.append(message)
+
+    rule = setting.deadline.default
+    timeout: float = rule.timeout_seconds
+    rule.timeout_seconds = 0.01
+    exceeded: int = deadline_stats.deadline_exceeded
+    try:
+        await DeadlineMiddleware(slow_app)(
+            {"type": "http", "path": "/api/users/list"}, None, send
+        )
+    finally:
+        rule.timeout_seconds = timeout
+
+    assert messages[0]["status"] == 504
+    assert deadline_stats.deadline_exceeded == exceeded + 1
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import bcrypt
+import pytest
+
+from src.core.config import setting
+from src.core.hashing import hash_rounds, needs_rehash
+from src.core.jwt_utils import create_hash_password, create_jwt, decode_jwt
+from src.core import principal_cache as principal_cache_module
+from src.core.principal_cache import (
+    InvalidationListener,
+    Principal,
+    PrincipalCache,
+    principal_from_claims,
+)
+from src.core.revocation import BloomFilter
+from src.core.token_cache import TokenCache, token_cache
+
+
+async def test_decode_jwt_cached(event_loop: asyncio.AbstractEventLoop):
+    token: str = await create_jwt("1")
+    hits: int = token_cache.hits
+
+    first = await decode_jwt(token)
+    second = await decode_jwt(token)
+
+    assert first == second
+    assert first["sub"] == "1"
+    assert token_cache.hits == hits + 1
+
+
+def test_token_cache_expire_and_size():
+    cache = TokenCache(maxsize=2)
+    cache.put("a", {"sub": "1", "exp": time.time() - 1})
+    cache.put("b", {"sub": "2", "exp": time.time() + 60})
+    cache.put("c", {"sub": "3", "exp": time.time() + 60})
+    cache.put("d", {"sub": "4", "exp": time.time() + 60})
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("d")["sub"] == "4"
+    assert cache.stats()["size"] == 2
+
+
+async def test_principal_from_claims(event_loop: asyncio.AbstractEventLoop):
+    token: str = await create_jwt("7", claims={"role": "superuser", "ver": 3})
+    payload: dict = await decode_jwt(token)
+
+    principal = principal_from_claims(payload)
+    assert principal.id == 7
+    assert principal.is_superuser
+    assert principal.version == 3
+
+    payload["iat"] -= setting.auth_jwt.stateless_max_age_seconds + 1
+    assert principal_from_claims(payload) is None
+
+
+def test_principal_cache_ttl(monkeypatch: pytest.MonkeyPatch):
+    now = [1000.0]
+    monkeypatch.setattr(principal_cache_module.time, "monotonic", lambda: now[0])
+    cache = PrincipalCache(ttl=30, maxsize=2)
+    cache.put(Principal(id=1, is_superuser=True))
+
+    now[0] += 29
+    assert cache.get(1) == Principal(id=1, is_superuser=True)
+    now[0] += 1
+    assert cache.get(1) is None
+    assert cache.stats()["size"] == 0
+
+    cache.put(Principal(id=1, is_superuser=False))
+    cache.put(Principal(id=2, is_superuser=False))
+    cache.get(1)
+    cache.put(Principal(id=3, is_superuser=False))
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+
+
+def test_principal_cache_invalidation_notify():
+    cache = PrincipalCache(ttl=30, maxsize=10)
+    listener = InvalidationListener(cache=cache, channel="principal_invalidate")
+    cache.put(Principal(id=1, is_superuser=True))
+    cache.put(Principal(id=2, is_superuser=False))
+
+    # роль пользователя 1 изменена другим воркером
+    listener._on_notify(None, 0, "principal_invalidate", "1")
+    assert cache.get(1) is None
+    assert cache.get(2) is not None
+
+    listener._on_notify(None, 0, "principal_invalidate", "bad")
+    assert cache.get(2) is not None
+    listener._on_notify(None, 0, "principal_invalidate", "*")
+    assert cache.get(2) is None
+
+
+async def test_hash_password_rounds(event_loop: asyncio.AbstractEventLoop):
+    hashed_password: bytes = await create_hash_password("1qaz!QAZ")
+
+    assert hash_rounds(hashed_password.decode()) == setting.password_hashing.rounds
+    assert not needs_rehash(hashed_password.decode())
+    assert needs_rehash(bcrypt.hashpw(b"1qaz!QAZ", bcrypt.gensalt(rounds=4)).decode())
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"revoked-{i}")
+
+    assert all(f"revoked-{i}" in bloom for i in range(1000))
+    false_positive = sum(f"valid-{i}" in bloom for i in range(10000))
+    assert false_positive < 300
@@ -0,0 +1,39 @@
+import asyncio
+
+from src.core.load_shedding import (
+    LoadSheddingMiddleware,
+    load_stats,
+    priority_for_path,
+    should_shed,
+)
+
+
+def test_priority_for_path():
+    assert priority_for_path("/api/books/list") == "low"
+    assert priority_for_path("/api/library/borrow") == "critical"
+    assert priority_for_path("/api/users/list") == "normal"
+
+
+async def test_shed_low_priority_first(event_loop: asyncio.AbstractEventLoop):
+    messages: list[dict] = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        messages.append(message)
+
+    middleware = LoadSheddingMiddleware(app)
+    load_stats.in_flight = 100
+    try:
+        assert should_shed("low") == "in_flight"
+        assert should_shed("normal") is None
+        assert should_shed("critical") is None
+
+        await middleware({"type": "http", "path": "/api/books/list"}, None, send)
+        await middleware({"type": "http", "path": "/api/library/borrow"}, None, send)
+    finally:
+        load_stats.in_flight = 0
+
+    statuses = [message["status"] for message in messages if "status" in message]
+    assert statuses == [503, 200]
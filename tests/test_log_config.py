@@ -0,0 +1,52 @@
+import logging
+import queue
+
+import orjson
+
+from src.core.log_config import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    RequestIdFilter,
+    SamplingFilter,
+    request_id_var,
+)
+
+
+def _record(name: str, level: int, msg: str, *args) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_sampling_filter():
+    sampling = SamplingFilter({"src.api_v1.books": 0.0})
+
+    assert not sampling.filter(_record("src.api_v1.books.crud", logging.INFO, "list"))
+    assert sampling.filter(_record("src.api_v1.books.crud", logging.WARNING, "slow"))
+    assert sampling.filter(_record("src.api_v1.users.crud", logging.INFO, "user"))
+
+
+def test_json_with_request_id():
+    token = request_id_var.set("abc123")
+    try:
+        record = _record("src.api_v1.books.crud", logging.INFO, "Delete book by id %d", 5)
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    data: dict = orjson.loads(JsonFormatter().format(record))
+    assert data["message"] == "Delete book by id 5"
+    assert data["request_id"] == "abc123"
+    assert data["level"] == "INFO"
+
+
+def test_queue_handler_lazy_format():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+
+    record = handler.prepare(_record("test", logging.INFO, "User %s", "petr"))
+    assert record.args == ("petr",)
+
+    record = handler.prepare(_record("test", logging.INFO, "Rows %s", [1, 2]))
+    assert record.msg == "Rows [1, 2]" and record.args is None
+
+    handler.enqueue(record)
+    handler.enqueue(record)
+    assert handler.dropped == 1
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+from src.core import metrics as metrics_module
+from src.core.metrics import MetricsRegistry
+
+
+def test_metrics_aggregate_workers(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    directory: str = str(tmp_path / "metrics")
+    worker = MetricsRegistry(directory=directory, buckets=[0.1, 1.0], flush_seconds=60)
+    other_worker = MetricsRegistry(directory=directory, buckets=[0.1, 1.0], flush_seconds=60)
+
+    monkeypatch.setattr(metrics_module.os, "getpid", lambda: 1001)
+    other_worker.inc("library_borrows_total")
+    other_worker.observe(
+        "http_request_duration_seconds", 0.05, method="GET", route="/api/books/list"
+    )
+    other_worker.flush(force=True)
+
+    monkeypatch.setattr(metrics_module.os, "getpid", lambda: 1002)
+    worker.inc("library_borrows_total", 2)
+    worker.inc("login_failures_total", reason="bad_password")
+    worker.observe(
+        "http_request_duration_seconds", 0.5, method="GET", route="/api/books/list"
+    )
+
+    text: str = worker.render()
+    assert "library_borrows_total 3\n" in text
+    assert 'login_failures_total{reason="bad_password"} 1\n' in text
+    labels = 'method="GET",route="/api/books/list"'
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.1"}} 1\n' in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="1"}} 2\n' in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2\n' in text
+    assert f"http_request_duration_seconds_count{{{labels}}} 2\n" in text
+    assert "# TYPE library_returns_total counter\n" in text
+
+    with pytest.raises(ValueError):
+        worker.inc("unknown_total")
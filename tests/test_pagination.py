@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.core.exceptions import InvalidCursor
+from src.core.pagination import decode_cursor, encode_cursor, keyset_condition
+from src.models.book import Book
+
+
+def test_cursor_roundtrip():
+    cursor: str = encode_cursor("-release_date", 1999, 42)
+    assert decode_cursor(cursor, "-release_date") == (1999, 42)
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, "release_date")
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not a cursor", "id")
+
+
+def test_keyset_condition_nullable():
+    def sql(condition) -> str:
+        return str(condition.compile(dialect=postgresql.dialect()))
+
+    assert sql(keyset_condition(Book.id, Book.id, False, 5, 5)).startswith(
+        "books.id > %(id_1)s"
+    )
+    assert "IS NULL" in sql(keyset_condition(Book.release_date, Book.id, False, 1999, 5))
+    assert "IS NULL" not in sql(keyset_condition(Book.title, Book.id, True, "A", 5))
+    assert sql(keyset_condition(Book.release_date, Book.id, False, None, 5)).startswith(
+        "books.release_date IS NULL AND books.id > %(id_1)s"
+    )
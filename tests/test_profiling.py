@@ -0,0 +1,46 @@
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+
+from src.core.config import setting
+from src.core.profiling import (
+    SamplingProfiler,
+    current_profiler,
+    list_profiles,
+    profile_path,
+    save_profile,
+)
+
+
+def busy_handler(seconds: float) -> None:
+    deadline: float = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def test_sampling_profiler(
+    event_loop: asyncio.AbstractEventLoop,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(setting.profiling, "path", str(tmp_path))
+
+    profiler = SamplingProfiler(interval=0.001)
+    token = current_profiler.set(profiler)
+    profiler.start()
+    try:
+        busy_handler(0.05)
+    finally:
+        profiler.stop()
+        current_profiler.reset(token)
+
+    assert profiler.samples > 0
+    assert any("busy_handler" in stack for stack in profiler.stacks)
+
+    target: Path = save_profile(profiler, "GET", "/api/books/list")
+    assert target is not None
+    assert list_profiles()[0]["name"] == target.name
+    assert profile_path(target.name) == target
+    assert profile_path("../secret.folded") is None
@@ -0,0 +1,31 @@
+import pytest
+
+from src.core.query_stats import QueryStats, query_budget, redact_statement
+
+
+def test_redact_statement():
+    statement = "SELECT books.id\n  FROM books WHERE books.title = 'Secret' AND books.count > 10 AND books.id = $1"
+    assert redact_statement(statement) == (
+        "SELECT books.id FROM books WHERE books.title = '?' AND books.count > ? "
+        "AND books.id = $1"
+    )
+
+
+def test_query_budget_and_repeated():
+    with query_budget(3) as stats:
+        for _ in range(3):
+            stats.record("SELECT users.id FROM users WHERE users.id = $1", 0.001)
+    assert stats.count == 3
+    assert stats.repeated(threshold=3) == {
+        "SELECT users.id FROM users WHERE users.id = $1": 3
+    }
+
+    parent = QueryStats()
+    child = QueryStats(parent=parent)
+    child.record("SELECT ?", 0.5)
+    assert parent.count == 1
+    assert parent.slowest_statement == "SELECT ?"
+
+    with pytest.raises(AssertionError):
+        with query_budget(0) as stats:
+            stats.record("SELECT ?", 0.001)
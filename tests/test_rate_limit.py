@@ -0,0 +1,20 @@
+from pathlib import Path
+
+from src.core.config import RateLimitRule
+from src.core.rate_limit import SharedBucketStore
+
+
+def test_token_bucket(tmp_path: Path):
+    path: str = str(tmp_path / "rate_limit")
+    rule = RateLimitRule(rate=1, burst=3)
+    store = SharedBucketStore(path=path, slots=64)
+    other_worker = SharedBucketStore(path=path, slots=64)
+
+    assert store.take("books:ip:10.0.0.1", rule) == 0
+    assert other_worker.take("books:ip:10.0.0.1", rule) == 0
+    assert store.take("books:ip:10.0.0.1", rule) == 0
+    assert other_worker.take("books:ip:10.0.0.1", rule) > 0
+    assert store.take("books:ip:10.0.0.2", rule) == 0
+
+    store.close()
+    other_worker.close()
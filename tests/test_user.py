@@ -1,12 +1,16 @@
 from httpx import AsyncClient
-
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 from sqlalchemy import select
 from sqlalchemy.engine import Result
 import asyncio
+from datetime import datetime, timedelta, timezone
 
 from src.models.user import User
 from src.core.config import COOKIE_NAME
+from src.core.principal_cache import Principal, principal_cache
+from src.core.revocation import RevocationList
+from src.api_v1.users.crud import get_principal_by_id
+from src.models.revoked_token import RevokedToken
 
 username = "Bob"
 email = "Bob@mail.ru"
@@ -159,3 +163,213 @@ async def test_user_delete(
 
     assert response.status_code == 204
     assert user_db is None
+
+
+async def test_create_user_with_password(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+    token_admin: str,
+):
+    user = {
+        "username": "Anna",
+        "email": "anna@mail.ru",
+        "password": "3edc#EDC",
+    }
+    cookies = {COOKIE_NAME: token_admin}
+
+    response = await client.post(
+        "/api/users/create",
+        json=user,
+        cookies=cookies,
+    )
+    assert response.status_code == 201
+
+    response = await client.post(
+        "/api/users/login",
+        json={"email": "anna@mail.ru", "password": "3edc#EDC"},
+    )
+    assert response.status_code == 202
+    assert "access_token" in response.json()
+
+
+async def test_logout_revokes_token(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+    test_user_admin: User,
+):
+    response = await client.post(
+        "/api/users/login",
+        json={"email": "testuser@example.com", "password": "1qaz!QAZ"},
+    )
+    cookies = {COOKIE_NAME: response.json()["access_token"]}
+
+    response = await client.get("/api/books/list", cookies=cookies)
+    assert response.status_code == 200
+    # principal закеширован, но кеш не обходит проверку отзыва токена
+    assert principal_cache.get(test_user_admin.id) is not None
+
+    response = await client.get("/api/users/logout", cookies=cookies)
+    assert response.status_code == 200
+
+    response = await client.get("/api/books/list", cookies=cookies)
+    assert response.status_code == 401
+
+    # повторный выход с тем же токеном не ошибка
+    response = await client.get("/api/users/logout", cookies=cookies)
+    assert response.status_code == 200
+
+
+async def test_principal_cache_invalidated_on_update(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+    token_admin: str,
+    test_user: User,
+    db_session: AsyncSession,
+):
+    cached: Principal = await get_principal_by_id(session=db_session, id_user=test_user.id)
+    assert principal_cache.get(test_user.id) == cached
+
+    response = await client.patch(
+        f"/api/users/{test_user.id}/",
+        json={"username": "Petr"},
+        cookies={COOKIE_NAME: token_admin},
+    )
+    assert response.status_code == 200
+    assert principal_cache.get(test_user.id) is None
+
+    await db_session.refresh(test_user)
+    principal: Principal = await get_principal_by_id(
+        session=db_session, id_user=test_user.id
+    )
+    assert principal.version == cached.version + 1
+
+
+async def test_pool_stats(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+    token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get("/api/internal/pool", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "primary"
+
+
+async def test_list_users(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+    token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get("/api/users/list", cookies=cookies)
+
+    assert response.status_code == 200
+    assert "testuser@example.com" in [user["email"] for user in response.json()]
+
+
+async def test_statement_stats(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+    token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get("/api/internal/statements", cookies=cookies)
+
+    assert response.status_code == 200
+    assert response.json()["statements"]["user_by_email"]["hits"] > 0
+
+
+async def test_metrics(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+):
+    await client.post(
+        "/api/users/login",
+        json={"email": "testuser@example.com", "password": "wrong-password"},
+    )
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'login_failures_total{reason="bad_password"}' in response.text
+    assert 'route="/api/users/login"' in response.text
+
+
+async def test_profile_request(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+    token_admin: str,
+):
+    cookies = {COOKIE_NAME: token_admin}
+    response = await client.get(
+        "/api/books/list", cookies=cookies, headers={"X-Profile": "1"}
+    )
+    assert response.status_code == 200
+
+    response = await client.get("/api/internal/profiles", cookies=cookies)
+    assert response.status_code == 200
+    name: str = response.json()[0]["name"]
+    assert "api_books_list" in name
+
+    response = await client.get(f"/api/internal/profiles/{name}", cookies=cookies)
+    assert response.status_code == 200
+
+
+async def test_profile_request_revoked_token(
+    event_loop: asyncio.AbstractEventLoop,
+    client: AsyncClient,
+    token_admin: str,
+):
+    admin_cookies = {COOKIE_NAME: token_admin}
+    response = await client.get("/api/internal/profiles", cookies=admin_cookies)
+    before: int = len(response.json())
+
+    response = await client.post(
+        "/api/users/login",
+        json={"email": "testuser@example.com", "password": "1qaz!QAZ"},
+    )
+    cookies = {COOKIE_NAME: response.json()["access_token"]}
+    response = await client.get("/api/users/logout", cookies=cookies)
+    assert response.status_code == 200
+
+    # токен отозван: claim role=superuser профилирование не включает
+    response = await client.get("/", cookies=cookies, headers={"X-Profile": "1"})
+    assert response.status_code == 200
+
+    response = await client.get("/api/internal/profiles", cookies=admin_cookies)
+    assert len(response.json()) == before
+
+
+async def test_revocation_rebuild_in_own_session(
+    event_loop: asyncio.AbstractEventLoop,
+    db_engine: AsyncEngine,
+    db_session: AsyncSession,
+):
+    now = datetime.now(timezone.utc)
+    db_session.add_all(
+        [
+            RevokedToken(jti="rebuild-expired", expires_at=now - timedelta(minutes=1)),
+            RevokedToken(jti="rebuild-active", expires_at=now + timedelta(minutes=15)),
+        ]
+    )
+    await db_session.commit()
+
+    revocation = RevocationList(
+        capacity=2,
+        error_rate=0.01,
+        refresh_seconds=0,
+        session_factory=async_sessionmaker(db_engine, expire_on_commit=False),
+    )
+    assert await revocation.is_revoked(session=db_session, jti="rebuild-active")
+    # фильтр заполнен: перестроение уходит в фоновую задачу со своей сессией,
+    # сессия запроса только читает
+    assert not await revocation.is_revoked(session=db_session, jti="unknown")
+    await revocation._rebuild_task
+
+    result: Result = await db_session.execute(
+        select(RevokedToken.jti).where(RevokedToken.jti.like("rebuild-%"))
+    )
+    assert result.scalars().all() == ["rebuild-active"]
+    assert await revocation.is_revoked(session=db_session, jti="rebuild-active")
+    assert not await revocation.is_revoked(session=db_session, jti="rebuild-expired")